@@ -18,6 +18,10 @@ from datetime import datetime
 from typing import List, Dict, Optional, Any, Union
 import json
 import argparse
+import socket
+import io
+import hashlib
+from urllib.parse import urljoin
 
 # Cria as pastas para logs e debug se não existirem
 os.makedirs('logs', exist_ok=True)
@@ -37,11 +41,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Cache de DNS local ao processo: evita resolver o mesmo host a cada nova conexão
+_getaddrinfo_original = socket.getaddrinfo
+_cache_dns: Dict[tuple, list] = {}
+
+def _getaddrinfo_com_cache(host, port, *args, **kwargs):
+    """Versão memoizada de socket.getaddrinfo, indexada pelos argumentos da chamada"""
+    chave = (host, port, args, tuple(sorted(kwargs.items())))
+    resultado = _cache_dns.get(chave)
+    if resultado is None:
+        resultado = _getaddrinfo_original(host, port, *args, **kwargs)
+        _cache_dns[chave] = resultado
+    return resultado
+
+socket.getaddrinfo = _getaddrinfo_com_cache
+
 class PopsDiscosScraper:
     """Classe para extrair informações de CDs do site Pops Discos"""
     
     BASE_URL = "https://www.popsdiscos.com.br"
     DEFAULT_OUTPUT = "produtos_cd_pops_discos.csv"
+    ARQUIVO_HASHES = "debug/pops_discos_vistos.bin"
+    TAMANHO_HASH = 8
     
     def __init__(self, url_inicial: str = None, 
                  max_paginas: int = 100, 
@@ -67,6 +88,14 @@ class PopsDiscosScraper:
         self.arquivo_saida = arquivo_saida or self.DEFAULT_OUTPUT
         self.modo = modo.lower()
         self.todos_produtos = []
+        self._url_base = f"{self.BASE_URL}/"
+        self._contador_debug = 0
+        # Hashes do conteúdo das páginas de detalhe cujos produtos já estão no CSV
+        self._hashes_vistos = set()
+        self._detalhes_por_hash = {}
+        # Hash da página de detalhe de cada produto desta execução, que só entra em
+        # _hashes_vistos depois que o produto é gravado no CSV
+        self._hash_por_url = {}
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
@@ -75,8 +104,20 @@ class PopsDiscosScraper:
             'Referer': 'https://www.popsdiscos.com.br/'
         }
         
+        # Resolve o DNS do site uma única vez para toda a execução
+        self._pre_resolver_dns()
+        
         # Verificar se já existe arquivo de produtos para continuar a partir dele
         self._carregar_produtos_existentes()
+        self._carregar_hashes_vistos()
+    
+    def _pre_resolver_dns(self) -> None:
+        """Popula o cache de DNS com o endereço do site antes da primeira requisição"""
+        host = self.BASE_URL.split('://', 1)[-1].split('/')[0]
+        try:
+            socket.getaddrinfo(host, 443, 0, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            logger.warning(f"Não foi possível pré-resolver o DNS de {host}: {e}")
     
     def _carregar_produtos_existentes(self) -> None:
         """Carrega produtos de um arquivo CSV existente, se disponível"""
@@ -94,34 +135,79 @@ class PopsDiscosScraper:
             except Exception as e:
                 logger.error(f"Erro ao carregar arquivo existente: {e}")
     
-    def _fazer_requisicao(self, url: str) -> Optional[BeautifulSoup]:
+    def _carregar_hashes_vistos(self) -> None:
+        """Carrega os hashes de páginas de detalhe processadas em execuções anteriores"""
+        if self.modo == "full" or not os.path.exists(self.ARQUIVO_HASHES):
+            return
+        
+        try:
+            with open(self.ARQUIVO_HASHES, 'rb') as arquivo:
+                dados = arquivo.read()
+            n = self.TAMANHO_HASH
+            self._hashes_vistos = {dados[i:i + n] for i in range(0, len(dados) - n + 1, n)}
+            logger.info(f"Carregados {len(self._hashes_vistos)} hashes de páginas já processadas.")
+        except Exception as e:
+            logger.error(f"Erro ao carregar hashes de páginas processadas: {e}")
+    
+    def _salvar_hashes_vistos(self) -> None:
+        """Persiste os hashes das páginas de detalhe para as próximas execuções"""
+        try:
+            with open(self.ARQUIVO_HASHES, 'wb') as arquivo:
+                arquivo.write(b''.join(self._hashes_vistos))
+        except Exception as e:
+            logger.error(f"Erro ao salvar hashes de páginas processadas: {e}")
+    
+    def _marcar_paginas_gravadas(self, urls_produtos) -> None:
+        """Marca como vistas as páginas de detalhe dos produtos já presentes no CSV"""
+        for url_produto in urls_produtos:
+            hash_pagina = self._hash_por_url.pop(url_produto, None)
+            if hash_pagina is not None:
+                self._hashes_vistos.add(hash_pagina)
+    
+    def _baixar_pagina(self, url: str) -> Optional[requests.Response]:
         """
-        Faz uma requisição HTTP e retorna o objeto BeautifulSoup
+        Faz uma requisição HTTP e retorna a resposta
         
         Args:
             url: URL para acessar
             
         Returns:
-            BeautifulSoup object ou None em caso de erro
+            Resposta HTTP ou None em caso de erro
         """
         try:
             resposta = requests.get(url, headers=self.headers, timeout=30)
             resposta.raise_for_status()
             
             # Salva a página para debug
-            # Gera um nome seguro para o arquivo de debug
+            # Gera um nome seguro para o arquivo de debug (prefixo da execução + contador)
             url_safe = url.split('?')[0].split('/')[-1]
             if not url_safe:
                 url_safe = 'index'
-            debug_filename = f"debug/pops_discos_{url_safe}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+            self._contador_debug += 1
+            debug_filename = f"debug/pops_discos_{data_hora}_{self._contador_debug:05d}_{url_safe}.html"
             with open(debug_filename, "w", encoding="utf-8") as f:
                 f.write(resposta.text)
             
-            return BeautifulSoup(resposta.text, 'html.parser')
+            return resposta
         except requests.exceptions.RequestException as e:
             logger.error(f"Erro na requisição para {url}: {e}")
             return None
     
+    def _fazer_requisicao(self, url: str) -> Optional[BeautifulSoup]:
+        """
+        Faz uma requisição HTTP e retorna o objeto BeautifulSoup
+        
+        Args:
+            url: URL para acessar
+            
+        Returns:
+            BeautifulSoup object ou None em caso de erro
+        """
+        resposta = self._baixar_pagina(url)
+        if resposta is None:
+            return None
+        return BeautifulSoup(resposta.text, 'html.parser')
+    
     def obter_categorias(self) -> List[Dict[str, str]]:
         """
         Obtém a lista de categorias de CDs do site
@@ -130,6 +216,7 @@ class PopsDiscosScraper:
             Lista de dicionários com nome e URL de cada categoria
         """
         categorias = []
+        vistas = set()
         soup = self._fazer_requisicao(self.url_inicial)
         
         if not soup:
@@ -142,19 +229,19 @@ class PopsDiscosScraper:
             
             for link in links_categorias:
                 nome_categoria = link.get_text().strip()
-                url_categoria = link['href']
-                
-                # Verifica se é uma URL relativa e adiciona o domínio base
-                if not url_categoria.startswith('http'):
-                    url_categoria = f"{self.BASE_URL}/{url_categoria}" if not url_categoria.startswith('/') else f"{self.BASE_URL}{url_categoria}"
+                # Resolve URLs relativas a partir do domínio base
+                url_categoria = urljoin(self._url_base, link['href'])
                 
                 # Adiciona à lista de categorias
-                if {'nome': nome_categoria, 'url': url_categoria} not in categorias:
-                    categorias.append({
-                        'nome': nome_categoria,
-                        'url': url_categoria
-                    })
-                    logger.info(f"Categoria encontrada: {nome_categoria}")
+                chave = (nome_categoria, url_categoria)
+                if chave in vistas:
+                    continue
+                vistas.add(chave)
+                categorias.append({
+                    'nome': nome_categoria,
+                    'url': url_categoria
+                })
+                logger.info(f"Categoria encontrada: {nome_categoria}")
             
             logger.info(f"Total de {len(categorias)} categorias encontradas")
             return categorias
@@ -180,6 +267,9 @@ class PopsDiscosScraper:
         if not soup:
             return produtos
         
+        # Um único timestamp por página (produtos da mesma página compartilham a data de extração)
+        data_extracao = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
         try:
             # Procura por produtos na página
             # O site da Pops Discos tem CDs listados em tabelas
@@ -188,9 +278,7 @@ class PopsDiscosScraper:
             for link in links_produtos:
                 try:
                     # No site da Pops Discos, cada CD tem um link com um código único
-                    url_produto = link['href']
-                    if not url_produto.startswith('http'):
-                        url_produto = f"{self.BASE_URL}/{url_produto}" if not url_produto.startswith('/') else f"{self.BASE_URL}{url_produto}"
+                    url_produto = urljoin(self._url_base, link['href'])
                     
                     # Verifica se tem CD no texto do link
                     texto_link = link.get_text().strip()
@@ -220,9 +308,12 @@ class PopsDiscosScraper:
                         # Adiciona categoria e URL
                         detalhes['categoria'] = nome_categoria
                         detalhes['url'] = url_produto
-                        detalhes['data_extracao'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        detalhes['data_extracao'] = data_extracao
                         
                         produtos.append(detalhes)
+                    else:
+                        # O produto já está no CSV: a página pode ser marcada como vista
+                        self._marcar_paginas_gravadas((url_produto,))
                 
                 except Exception as e:
                     logger.error(f"Erro ao processar link de produto: {e}")
@@ -245,11 +336,22 @@ class PopsDiscosScraper:
         Returns:
             Dicionário com detalhes do produto ou None se falhar
         """
-        soup = self._fazer_requisicao(url_produto)
+        resposta = self._baixar_pagina(url_produto)
         
-        if not soup:
+        if resposta is None:
             return None
         
+        # Páginas com conteúdo idêntico não precisam ser analisadas novamente
+        hash_pagina = hashlib.blake2b(resposta.content, digest_size=self.TAMANHO_HASH).digest()
+        self._hash_por_url[url_produto] = hash_pagina
+        if hash_pagina in self._detalhes_por_hash:
+            return dict(self._detalhes_por_hash[hash_pagina])
+        if hash_pagina in self._hashes_vistos:
+            logger.debug(f"Página de detalhe já processada anteriormente: {url_produto}")
+            return None
+        
+        soup = BeautifulSoup(resposta.text, 'html.parser')
+        
         try:
             # Inicializa variáveis
             titulo = ""
@@ -346,13 +448,15 @@ class PopsDiscosScraper:
             # Registro de debug com mais detalhes
             logger.info(f"Produto extraído: {titulo} | Artista: {artista} | Álbum: {album} | Preço: {preco} | Código: {codigo_cd}")
             
-            return {
+            detalhes = {
                 'titulo': titulo,
                 'artista': artista,
                 'album': album,
                 'preco': preco,
                 'codigo': codigo_cd
             }
+            self._detalhes_por_hash[hash_pagina] = detalhes
+            return dict(detalhes)
             
         except Exception as e:
             logger.error(f"Erro ao extrair detalhes do produto {url_produto}: {e}")
@@ -412,16 +516,20 @@ class PopsDiscosScraper:
             # Verifica se o arquivo já existe e se o modo é 'w'
             arquivo_existe = os.path.exists(self.arquivo_saida)
             
+            # Monta o lote em memória para gravar tudo com uma única escrita
+            buffer = io.StringIO()
+            escritor = csv.DictWriter(buffer, fieldnames=campos, quoting=csv.QUOTE_ALL)
+            
+            # Escreve o cabeçalho apenas se estiver criando um novo arquivo
+            if modo == 'w' or not arquivo_existe:
+                escritor.writeheader()
+            
+            # Escreve os dados de cada produto
+            escritor.writerows(produtos)
+            
             # Escreve no arquivo CSV
             with open(self.arquivo_saida, modo, newline='', encoding='utf-8') as arquivo:
-                escritor = csv.DictWriter(arquivo, fieldnames=campos, quoting=csv.QUOTE_ALL)
-                
-                # Escreve o cabeçalho apenas se estiver criando um novo arquivo
-                if modo == 'w' or not arquivo_existe:
-                    escritor.writeheader()
-                
-                # Escreve os dados de cada produto
-                escritor.writerows(produtos)
+                arquivo.write(buffer.getvalue())
             
             logger.info(f"Dados salvos com sucesso no arquivo {self.arquivo_saida}")
             return True
@@ -473,8 +581,10 @@ class PopsDiscosScraper:
                         else:
                             modo = 'a'  # Todas as outras situações
                         
-                        # Salva os produtos no CSV
-                        self.salvar_para_csv(produtos, modo=modo)
+                        # Salva os produtos no CSV; só então as páginas de detalhe
+                        # deles passam a ser ignoradas nas próximas execuções
+                        if self.salvar_para_csv(produtos, modo=modo):
+                            self._marcar_paginas_gravadas(produto['url'] for produto in produtos)
                         
                         # Atualiza a lista de todos os produtos
                         self.todos_produtos.extend(produtos)
@@ -488,11 +598,7 @@ class PopsDiscosScraper:
                     url_proxima = self.encontrar_proxima_pagina(soup, pagina_atual)
                     
                     if url_proxima:
-                        if not url_proxima.startswith('http'):
-                            url = f"{self.BASE_URL}{url_proxima}" if url_proxima.startswith('/') else f"{self.BASE_URL}/{url_proxima}"
-                        else:
-                            url = url_proxima
-                        
+                        url = urljoin(self._url_base, url_proxima)
                         pagina_atual += 1
                     else:
                         # Se não encontrou próxima página, encerra o loop
@@ -503,6 +609,8 @@ class PopsDiscosScraper:
             
         except Exception as e:
             logger.error(f"Erro durante a execução do scraper: {e}")
+        finally:
+            self._salvar_hashes_vistos()
 
 def main():
     """Função principal para executar o scraper"""
@@ -7,15 +7,24 @@ Este script extrai informações de CDs do site https://sebodomessias.com.br/cds
 """
 
 import os
+import re
 import csv
+import json
+import gzip
+import hashlib
+from collections import namedtuple
 import time
 import random
 import logging
 import datetime
 import requests
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import List, Dict, Optional, Any, Union
 from urllib.parse import urljoin, urlparse, parse_qs, urlencode
+from concurrent.futures import ThreadPoolExecutor
 
 # Cria as pastas para logs e debug se não existirem
 os.makedirs('logs', exist_ok=True)
@@ -24,6 +33,14 @@ os.makedirs('debug', exist_ok=True)
 # Verificar se existe uma variável de ambiente para o diretório de debug
 DEBUG_DIR = os.environ.get('DEBUG_DIR', 'debug')
 
+# Dumps de HTML para debug só são gravados com SCRAPER_DEBUG=1
+SCRAPER_DEBUG = os.environ.get('SCRAPER_DEBUG') == '1'
+
+# Cache HTTP (ETag / Last-Modified) para requisições condicionais entre execuções
+CACHE_DIR = os.environ.get('CACHE_DIR', 'cache')
+os.makedirs(CACHE_DIR, exist_ok=True)
+ARQUIVO_CACHE_ETAGS = os.path.join(CACHE_DIR, 'sebo_messias_etags.json')
+
 # Configuração do logger
 data_hora = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 LOG_FILENAME = f"logs/scraper_sebo_messias_{data_hora}.log"
@@ -32,226 +49,413 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
+logger = logging.getLogger(__name__)
+
+# Brotli só é anunciado se o pacote estiver instalado para decodificar a resposta
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "br, gzip, deflate"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
 
 # Configurações
 URL_BASE = "https://sebodomessias.com.br/cds"
 ARQUIVO_CSV = "produtos_cd_sebo_messias.csv"
+CAMPOS_CSV = (
+    'titulo', 'artista', 'ano', 'conservacao',
+    'preco_original', 'preco_com_desconto', 'categoria', 'url', 'data_extracao'
+)
+# Produto na ordem das colunas do CSV: vai direto para writer.writerows
+Produto = namedtuple('Produto', CAMPOS_CSV)
+MAX_REQUISICOES_SIMULTANEAS = 4  # Páginas baixadas antecipadamente em paralelo
+PAGINAS_ENTRE_VERIFICACOES = 10  # Com o esquema de paginação conhecido, só analisa o HTML a cada N páginas
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
     "Accept-Language": "pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
+    "Accept-Encoding": ACCEPT_ENCODING,
     "Referer": "https://sebodomessias.com.br/"
 }
 
+# Sessão HTTP compartilhada: mantém a conexão (keep-alive) entre as páginas
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.5)
+)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+def carregar_cache_etags():
+    """Carrega o cache de ETag/Last-Modified por URL"""
+    try:
+        with open(ARQUIVO_CACHE_ETAGS, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.error(f"Erro ao carregar cache de ETags: {str(e)}")
+        return {}
+
+CACHE_ETAGS = carregar_cache_etags()
+
+def salvar_cache_etags():
+    """Persiste o cache de ETag/Last-Modified por URL"""
+    try:
+        with open(ARQUIVO_CACHE_ETAGS, 'w', encoding='utf-8') as f:
+            json.dump(CACHE_ETAGS, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        logger.error(f"Erro ao salvar cache de ETags: {str(e)}")
+
+def _xpath_classe(nome):
+    """Expressão XPath equivalente ao seletor CSS de classe (.nome)"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {nome} ')"
+
+def _primeiro(elemento, *expressoes):
+    """Retorna o primeiro nó encontrado pela primeira expressão XPath (compilada) que tiver resultado"""
+    for expressao in expressoes:
+        resultado = expressao(elemento)
+        if resultado:
+            return resultado[0]
+    return None
+
+# Parser que descarta comentários e instruções de processamento já na análise,
+# evitando criar nós que a extração nunca consulta
+_PARSER_HTML = lxml.html.HTMLParser(remove_comments=True, remove_pis=True)
+
+def _arvore(html):
+    """Retorna a árvore lxml do HTML (aceita também uma árvore já construída)"""
+    if isinstance(html, lxml.html.HtmlElement):
+        return html
+    return lxml.html.fromstring(html, parser=_PARSER_HTML)
+
+def _texto(elemento):
+    """Texto de um elemento (incluindo descendentes), sem espaços nas pontas"""
+    # Elementos folha (a maioria dos detalhes e preços) já têm o texto completo em .text,
+    # sem precisar percorrer e concatenar os descendentes
+    if len(elemento) == 0:
+        return (elemento.text or '').strip()
+    return elemento.text_content().strip()
+
+# Padrão de paginação embutido no caminho da URL (ex.: /cds/page/2/)
+_PAGE_RE = re.compile(r'/page/(\d+)/')
+
+# Prefixos dos detalhes do produto e o campo correspondente
+_FIELD_PREFIXES = (
+    ("Artista:", "artista"),
+    ("Ano:", "ano"),
+    ("Conservação:", "conservacao"),
+)
+
+# Expressões XPath usadas na extração
+# (a busca dos produtos é compilada uma única vez e avaliada inteiramente no libxml2)
+XPATH_PRODUTOS = etree.XPath('//li[.//h2]')
+XPATH_PRODUTOS_ALTERNATIVO = etree.XPath(f"//li[.//img][.//*[{_xpath_classe('product-name')}]]")
+
+# Campos de cada produto: compilados uma única vez; seletores alternativos são
+# unidos numa só expressão (o primeiro nó em ordem de documento vence)
+XPATH_TITULO = etree.XPath(f"(.//h2 | .//*[{_xpath_classe('product-name')}])[1]")
+XPATH_LINK = etree.XPath('(.//a)[1]')
+XPATH_DETALHES = etree.XPath('.//li')
+XPATH_DETALHES_ALTERNATIVO = etree.XPath(f".//*[{_xpath_classe('details')}]")
+XPATH_PRECO = etree.XPath(f"(.//*[{_xpath_classe('price-box')}] | .//*[{_xpath_classe('price')}])[1]")
+XPATH_PRECO_ORIGINAL = etree.XPath(f"(.//del | .//*[{_xpath_classe('old-price')}])[1]")
+# O preço com desconto mantém a ordem de prioridade: ".price" também aparece dentro do preço riscado
+XPATHS_PRECO_DESCONTO = (
+    etree.XPath('(.//ins)[1]'),
+    etree.XPath(f"(.//*[{_xpath_classe('special-price')}])[1]"),
+    etree.XPath(f"(.//*[{_xpath_classe('price')}])[1]"),
+)
+XPATH_CATEGORIA = etree.XPath(f"(.//*[{_xpath_classe('category')}])[1]")
+
+# Link da próxima página: uma única busca compilada, interrompida no primeiro resultado
+# (classe "next", rel="next", texto "Next"/"Próximo" no link, na paginação ou num span)
+XPATH_PROXIMA = etree.XPath(
+    "(//a[@href]["
+    f"{_xpath_classe('next')} or @rel = 'next'"
+    " or normalize-space() = 'Next' or normalize-space() = 'Próximo'"
+    f" or ((ancestor::*[{_xpath_classe('pages')} or {_xpath_classe('pagination')}] or .//span)"
+    " and (contains(., 'Next') or contains(., 'Próximo')))"
+    "])[1]/@href"
+)
+
+def salvar_html_debug(html, sufixo):
+    """Salva o HTML da página (compactado) para debug, se SCRAPER_DEBUG=1"""
+    if not SCRAPER_DEBUG:
+        return
+    
+    debug_filename = f"{DEBUG_DIR}/debug_page_sebo_{data_hora}_{sufixo}.html.gz"
+    with gzip.open(debug_filename, "wt", encoding="utf-8", compresslevel=1) as f:
+        f.write(html)
+    logger.info(f"Página salva para debug em: {debug_filename}")
+
 def setup():
     """Configuração inicial e verificação do arquivo CSV"""
-    logging.info("Iniciando scraper para o site Sebo do Messias")
+    logger.info("Iniciando scraper para o site Sebo do Messias")
     
     # Verifica se o arquivo CSV já existe
     file_exists = os.path.isfile(ARQUIVO_CSV)
     
-    # Abre o arquivo CSV para escrita
-    csv_file = open(ARQUIVO_CSV, 'a', newline='', encoding='utf-8')
+    # Abre o arquivo CSV para escrita (buffer de 1 MiB: a codificação e a escrita
+    # em disco acontecem em blocos grandes, não a cada linha)
+    csv_file = open(ARQUIVO_CSV, 'a', newline='', encoding='utf-8', buffering=1 << 20)
     writer = csv.writer(csv_file)
     
     # Escreve o cabeçalho se o arquivo não existir
     if not file_exists:
-        writer.writerow([
-            'titulo', 'artista', 'ano', 'conservacao', 
-            'preco_original', 'preco_com_desconto', 'categoria', 'url', 'data_extracao'
-        ])
-        logging.info("Arquivo CSV criado com cabeçalho")
+        writer.writerow(CAMPOS_CSV)
+        logger.info("Arquivo CSV criado com cabeçalho")
     
     return csv_file, writer
 
 def obter_pagina(url):
     """Obtém o conteúdo HTML da página"""
     try:
-        logging.info(f"Acessando URL: {url}")
+        logger.info(f"Acessando URL: {url}")
+        
+        # Usa os validadores da última execução para uma requisição condicional
+        headers = {}
+        entrada = CACHE_ETAGS.get(url)
+        if entrada and os.path.exists(entrada['html_path']):
+            if entrada.get('etag'):
+                headers['If-None-Match'] = entrada['etag']
+            if entrada.get('last_modified'):
+                headers['If-Modified-Since'] = entrada['last_modified']
         
         # Realiza a requisição HTTP
-        response = requests.get(url, headers=HEADERS)
-        response.raise_for_status()
+        response = SESSION.get(url, headers=headers, timeout=30)
         
         # Pausa para evitar sobrecarga no servidor
         time.sleep(random.uniform(1, 3))
         
-        return response.text
+        # Página não mudou desde a última execução: usa o HTML salvo
+        if response.status_code == 304:
+            logger.info(f"Página não modificada, usando cache: {url}")
+            with open(entrada['html_path'], 'r', encoding='utf-8') as f:
+                return f.read()
+        
+        response.raise_for_status()
+        logger.debug("Content-Encoding de %s: %s", url, response.headers.get('Content-Encoding'))
+        html = response.text
+        
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            html_path = os.path.join(CACHE_DIR, f"sebo_messias_{hashlib.md5(url.encode('utf-8')).hexdigest()}.html")
+            with open(html_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+            CACHE_ETAGS[url] = {'etag': etag, 'last_modified': last_modified, 'html_path': html_path}
+        
+        return html
     except requests.exceptions.RequestException as e:
-        logging.error(f"Erro ao acessar a página {url}: {str(e)}")
+        logger.error(f"Erro ao acessar a página {url}: {str(e)}")
         return None
 
 def extrair_produtos(html):
-    """Extrai informações dos produtos da página"""
+    """Extrai informações dos produtos da página (HTML ou árvore lxml já construída)"""
     produtos = []
+    # Todos os produtos da página compartilham o mesmo horário de extração
+    data_extracao = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     try:
-        soup = BeautifulSoup(html, 'html.parser')
+        tree = _arvore(html)
         
         # No Sebo do Messias, os produtos aparecem como itens em uma lista com detalhes específicos
         # Vamos procurar por todos os itens que têm lista de detalhes de CD
         
         # Procura por todas as entradas de produtos que começam com a estrutura observada no site
-        produtos_html = soup.find_all(lambda tag: tag.name == 'li' and tag.find('h2') is not None)
+        produtos_html = XPATH_PRODUTOS(tree)
         
         if not produtos_html:
             # Busca alternativa para identificar produtos
-            produtos_html = soup.select('li:has(img):has(.product-name)')
+            produtos_html = XPATH_PRODUTOS_ALTERNATIVO(tree)
         
-        logging.info(f"Encontrados {len(produtos_html)} produtos potenciais na página atual")
+        logger.debug("Encontrados %d produtos potenciais na página atual", len(produtos_html))
         
         # Debug - imprimir os primeiros produtos encontrados para ver sua estrutura
         for i, prod in enumerate(produtos_html[:3]):
-            logging.info(f"Estrutura do produto {i+1}: {prod.name} com classes {prod.get('class', [])}")
+            logger.debug("Estrutura do produto %d: %s com classes %s", i + 1, prod.tag, prod.get('class', '').split())
         
         for item in produtos_html:
             try:
                 # Extrai o título do produto
-                titulo_elem = item.find('h2') or item.select_one('.product-name')
-                if titulo_elem:
-                    titulo_link = titulo_elem.find('a')
-                    if titulo_link:
-                        titulo = titulo_link.get_text().strip()
-                        url = urljoin(URL_BASE, titulo_link['href']) if 'href' in titulo_link.attrs else ""
+                titulo_elem = _primeiro(item, XPATH_TITULO)
+                if titulo_elem is not None:
+                    titulo_link = _primeiro(titulo_elem, XPATH_LINK)
+                    if titulo_link is not None:
+                        titulo = _texto(titulo_link)
+                        href = titulo_link.get('href')
+                        url = urljoin(URL_BASE, href) if href is not None else ""
                     else:
-                        titulo = titulo_elem.get_text().strip()
+                        titulo = _texto(titulo_elem)
                         url = ""
                 else:
                     titulo = "Não disponível"
                     url = ""
                 
                 # Extrai detalhes do produto
-                detalhes = item.select('li') or item.select('.details')
+                detalhes = XPATH_DETALHES(item) or XPATH_DETALHES_ALTERNATIVO(item)
                 
-                artista = "Não disponível"
-                ano = "Não disponível"
-                conservacao = "Não disponível"
+                campos = {
+                    'artista': "Não disponível",
+                    'ano': "Não disponível",
+                    'conservacao': "Não disponível",
+                }
                 categoria = "CD"
                 
                 # Procura por elementos que contenham os detalhes do artista, ano e conservação
                 for detalhe in detalhes:
-                    texto = detalhe.get_text().strip()
-                    if "Artista:" in texto:
-                        artista = texto.replace("Artista:", "").strip()
-                    elif "Ano:" in texto:
-                        ano = texto.replace("Ano:", "").strip()
-                    elif "Conservação:" in texto:
-                        conservacao = texto.replace("Conservação:", "").strip()
-                    elif "CD" in texto and len(texto) < 30:  # Possível categoria
-                        categoria = texto.strip()
+                    texto = _texto(detalhe)
+                    for prefixo, campo in _FIELD_PREFIXES:
+                        if texto.startswith(prefixo):
+                            campos[campo] = texto[len(prefixo):].strip()
+                            break
+                    else:
+                        if "CD" in texto and len(texto) < 30:  # Possível categoria
+                            categoria = texto
+                
+                artista = campos['artista']
+                ano = campos['ano']
+                conservacao = campos['conservacao']
                 
                 # Identifica os preços - original e com desconto
                 preco_original = "Não disponível"
                 preco_com_desconto = "Não disponível"
                 
                 # Busca pelo elemento que contém os preços
-                preco_elem = item.select_one('.price-box') or item.select_one('.price')
+                preco_elem = _primeiro(item, XPATH_PRECO)
                 
-                if preco_elem:
+                if preco_elem is not None:
                     # Procura pelo preço original (normalmente riscado)
-                    preco_original_elem = preco_elem.select_one('del') or preco_elem.select_one('.old-price')
-                    if preco_original_elem:
-                        preco_original = preco_original_elem.get_text().strip()
+                    preco_original_elem = _primeiro(preco_elem, XPATH_PRECO_ORIGINAL)
+                    if preco_original_elem is not None:
+                        preco_original = _texto(preco_original_elem)
                     
                     # Procura pelo preço com desconto
-                    preco_desconto_elem = preco_elem.select_one('ins') or preco_elem.select_one('.special-price') or preco_elem.select_one('.price')
-                    if preco_desconto_elem:
-                        preco_com_desconto = preco_desconto_elem.get_text().strip()
+                    preco_desconto_elem = _primeiro(preco_elem, *XPATHS_PRECO_DESCONTO)
+                    if preco_desconto_elem is not None:
+                        preco_com_desconto = _texto(preco_desconto_elem)
                 
                 # Se não encontrou preço com desconto, usa o preço original
                 if preco_com_desconto == "Não disponível" and preco_original != "Não disponível":
                     preco_com_desconto = preco_original
                 
                 # Tenta extrair categoria diretamente
-                categoria_elem = item.select_one('.category')
-                if categoria_elem:
-                    categoria = categoria_elem.get_text().strip()
+                categoria_elem = _primeiro(item, XPATH_CATEGORIA)
+                if categoria_elem is not None:
+                    categoria = _texto(categoria_elem)
                 
                 # Adiciona o produto à lista
-                produtos.append({
-                    'titulo': titulo,
-                    'artista': artista,
-                    'ano': ano,
-                    'conservacao': conservacao,
-                    'preco_original': preco_original,
-                    'preco_com_desconto': preco_com_desconto,
-                    'categoria': categoria,
-                    'url': url,
-                    'data_extracao': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
+                produtos.append(Produto(
+                    titulo, artista, ano, conservacao,
+                    preco_original, preco_com_desconto, categoria, url, data_extracao
+                ))
                 
-                logging.info(f"Produto extraído: {titulo}")
+                logger.debug("Produto extraído: %s", titulo)
             
             except Exception as e:
-                logging.error(f"Erro ao extrair produto: {str(e)}")
+                logger.error(f"Erro ao extrair produto: {str(e)}")
                 continue
         
         return produtos
     
     except Exception as e:
-        logging.error(f"Erro ao extrair produtos da página: {str(e)}")
+        logger.error(f"Erro ao extrair produtos da página: {str(e)}")
         return []
 
+# Esquema de paginação já observado por domínio: 'p_query' (?p=N), 'page_path' (/page/N/) ou 'none'
+_ESQUEMAS_PAGINACAO = {}
+
+def _url_pagina_seguinte(url, esquema, parsed_url=None):
+    """Monta a URL da página seguinte segundo o esquema de paginação informado
+    (parsed_url permite reaproveitar a URL já decomposta pelo chamador)"""
+    if esquema == 'p_query':
+        parsed_url = parsed_url or urlparse(url)
+        query_params = parse_qs(parsed_url.query)
+        try:
+            pagina = int(query_params.get('p', ['1'])[0])
+        except ValueError:
+            return None
+        query_params['p'] = [str(pagina + 1)]
+        return parsed_url._replace(query=urlencode(query_params, doseq=True)).geturl()
+    
+    if esquema == 'page_path':
+        match = _PAGE_RE.search(url)
+        if match:
+            return _PAGE_RE.sub(f'/page/{int(match.group(1)) + 1}/', url, count=1)
+        if url.endswith('/'):
+            return url + 'page/2/'
+    
+    return None
+
+def _mesma_url(url_a, url_b):
+    """Compara duas URLs ignorando a ordem dos parâmetros da query"""
+    parsed_a = urlparse(url_a)
+    parsed_b = url_b if isinstance(url_b, tuple) else urlparse(url_b)
+    return (parsed_a.netloc, parsed_a.path, parse_qs(parsed_a.query)) == \
+        (parsed_b.netloc, parsed_b.path, parse_qs(parsed_b.query))
+
 def obter_proxima_pagina(html, url_atual):
-    """Verifica se existe próxima página e retorna sua URL"""
+    """Verifica se existe próxima página e retorna sua URL (recebe HTML ou árvore lxml)"""
+    # Decompõe a URL atual uma única vez para todos os ramos abaixo
+    parsed_atual = urlparse(url_atual)
+    dominio = parsed_atual.netloc
+    esquema = _ESQUEMAS_PAGINACAO.get(dominio)
+    
+    # Esquema conhecido: deriva a URL sem analisar o HTML, verificando a cada N páginas
+    if esquema and esquema['esquema'] != 'none' and esquema['sem_verificacao'] < PAGINAS_ENTRE_VERIFICACOES:
+        proxima = _url_pagina_seguinte(url_atual, esquema['esquema'], parsed_atual)
+        if proxima:
+            esquema['sem_verificacao'] += 1
+            return proxima
+    
+    proxima = _buscar_proxima_pagina(html, url_atual, parsed_atual)
+    
+    # Memoriza o esquema de paginação observado para as próximas páginas
+    if proxima:
+        observado = 'none'
+        parsed_proxima = urlparse(proxima)
+        for candidato in ('p_query', 'page_path'):
+            derivada = _url_pagina_seguinte(url_atual, candidato, parsed_atual)
+            if derivada and _mesma_url(derivada, parsed_proxima):
+                observado = candidato
+                break
+        _ESQUEMAS_PAGINACAO[dominio] = {'esquema': observado, 'sem_verificacao': 0}
+    
+    return proxima
+
+def _buscar_proxima_pagina(html, url_atual, parsed_url=None):
+    """Procura no HTML o link da próxima página, com alternativas baseadas na URL"""
     try:
-        soup = BeautifulSoup(html, 'html.parser')
+        tree = _arvore(html)
         
-        # Procura por links de navegação para a próxima página
-        next_link = None
-        
-        # Busca direta por elementos de paginação
-        paginacao = soup.select_one('.pages') or soup.select_one('.pagination')
-        
-        if paginacao:
-            # Tenta encontrar um link para a próxima página (geralmente "Next" ou "Próximo")
-            for link in paginacao.find_all('a'):
-                if 'Next' in link.get_text() or 'Próximo' in link.get_text() or 'next' in link.get('class', []):
-                    next_link = link
-                    break
-            
-            if next_link and 'href' in next_link.attrs:
-                return urljoin(URL_BASE, next_link['href'])
-        
-        # Se não encontrou com a busca acima, procura por links específicos de paginação
-        # Tenta encontrar o link "Next"
-        next_links = soup.find_all('a', string='Next') or soup.find_all('a', string='Próximo') or soup.select('a.next')
-        if next_links and 'href' in next_links[0].attrs:
-            return urljoin(URL_BASE, next_links[0]['href'])
-        
-        # Busca por link com texto "Next" dentro de um span
-        for link in soup.find_all('a'):
-            if link.find('span') and ('Next' in link.find('span').get_text() or 'Próximo' in link.find('span').get_text()):
-                return urljoin(URL_BASE, link['href'])
+        # Busca o link "Next"/"Próximo" com uma única consulta
+        hrefs = XPATH_PROXIMA(tree)
+        if hrefs:
+            return urljoin(URL_BASE, hrefs[0])
         
         # Alternativa: incrementar o parâmetro de página na URL
-        parsed_url = urlparse(url_atual)
-        query_params = parse_qs(parsed_url.query)
+        parsed_url = parsed_url or urlparse(url_atual)
         
         # Verifica se a URL usa parâmetros de paginação
-        if 'p' in query_params:
-            try:
-                current_page = int(query_params['p'][0])
-                query_params['p'] = [str(current_page + 1)]
-                new_query = urlencode(query_params, doseq=True)
-                parsed_url = parsed_url._replace(query=new_query)
-                return parsed_url.geturl()
-            except (ValueError, IndexError):
-                pass
+        if 'p' in parse_qs(parsed_url.query):
+            proxima = _url_pagina_seguinte(url_atual, 'p_query', parsed_url)
+            if proxima:
+                return proxima
         
         # Última tentativa: Verifica se a URL tem um formato de página numérica embutido
         # Exemplo: /cds/page/2/
         if '/page/' in url_atual:
             try:
                 # Extrai o número da página atual
-                page_pattern = r'/page/(\d+)/'
-                import re
-                match = re.search(page_pattern, url_atual)
+                match = _PAGE_RE.search(url_atual)
                 if match:
                     current_page = int(match.group(1))
                     next_page = current_page + 1
-                    return re.sub(page_pattern, f'/page/{next_page}/', url_atual)
+                    return _PAGE_RE.sub(f'/page/{next_page}/', url_atual)
             except Exception as e:
-                logging.error(f"Erro ao extrair número da página da URL: {str(e)}")
+                logger.error(f"Erro ao extrair número da página da URL: {str(e)}")
         
         # Se for a primeira página, tenta adicionar ?p=2 ou /page/2/
         if '?' not in url_atual and '/page/' not in url_atual:
@@ -263,28 +467,37 @@ def obter_proxima_pagina(html, url_atual):
         return None
     
     except Exception as e:
-        logging.error(f"Erro ao buscar próxima página: {str(e)}")
+        logger.error(f"Erro ao buscar próxima página: {str(e)}")
         return None
 
 def salvar_produtos(writer, produtos):
     """Salva os produtos no arquivo CSV"""
-    for produto in produtos:
-        writer.writerow([
-            produto['titulo'],
-            produto['artista'],
-            produto['ano'],
-            produto['conservacao'],
-            produto['preco_original'],
-            produto['preco_com_desconto'],
-            produto['categoria'],
-            produto['url'],
-            produto['data_extracao']
-        ])
+    writer.writerows(produtos)
     
-    logging.info(f"Salvos {len(produtos)} produtos no CSV")
+    logger.debug("Salvos %d produtos no CSV", len(produtos))
+
+def urls_paginas_seguintes(url, quantidade):
+    """Deriva as URLs das próximas páginas segundo o esquema de paginação já observado
+    para o domínio; sem esquema confirmado não há download antecipado, já que URLs
+    adivinhadas que não forem usadas só duplicariam as requisições"""
+    esquema = _ESQUEMAS_PAGINACAO.get(urlparse(url).netloc)
+    if not esquema or esquema['esquema'] == 'none':
+        return []
+    
+    urls = []
+    for _ in range(quantidade):
+        url = _url_pagina_seguinte(url, esquema['esquema'])
+        if not url:
+            break
+        urls.append(url)
+    return urls
 
 def extrair_todos_produtos():
     """Função principal que coordena a extração de produtos de todas as páginas"""
+    # Baixa as próximas páginas em paralelo enquanto a atual é processada;
+    # cada worker mantém a pausa aleatória de obter_pagina
+    executor = ThreadPoolExecutor(max_workers=MAX_REQUISICOES_SIMULTANEAS)
+    pendentes = {}
     try:
         # Configuração inicial
         csv_file, writer = setup()
@@ -296,84 +509,99 @@ def extrair_todos_produtos():
         
         # Loop de extração pelas páginas
         while url and pagina_atual <= max_paginas:
-            logging.info(f"Processando página {pagina_atual}")
+            logger.info(f"Processando página {pagina_atual}")
+            
+            # Obtém o HTML da página (usando o download antecipado, se houver)
+            futuro = pendentes.pop(url, None)
+            html = futuro.result() if futuro else obter_pagina(url)
+            
+            # Agenda o download antecipado das próximas páginas
+            restantes = max_paginas - pagina_atual
+            for url_seguinte in urls_paginas_seguintes(url, min(MAX_REQUISICOES_SIMULTANEAS, restantes)):
+                if url_seguinte not in pendentes:
+                    pendentes[url_seguinte] = executor.submit(obter_pagina, url_seguinte)
             
-            # Obtém o HTML da página
-            html = obter_pagina(url)
             if not html:
-                logging.error(f"Não foi possível obter a página {pagina_atual}")
+                logger.error(f"Não foi possível obter a página {pagina_atual}")
                 break
             
             # Salva a página HTML para debug
-            debug_filename = f"{DEBUG_DIR}/debug_page_sebo_{data_hora}_{pagina_atual}.html"
-            with open(debug_filename, "w", encoding="utf-8") as f:
-                f.write(html)
-            logging.info(f"Página salva para debug em: {debug_filename}")
+            salvar_html_debug(html, pagina_atual)
+            
+            # Analisa o HTML uma única vez para a extração e a paginação
+            try:
+                arvore = _arvore(html)
+            except (etree.ParserError, ValueError) as e:
+                logger.error(f"Não foi possível analisar a página {pagina_atual}: {str(e)}")
+                break
             
             # Extrai produtos da página
-            produtos = extrair_produtos(html)
+            produtos = extrair_produtos(arvore)
             
             if produtos:
                 # Salva produtos no CSV
                 salvar_produtos(writer, produtos)
                 total_produtos += len(produtos)
-                logging.info(f"Total acumulado de produtos: {total_produtos}")
+                logger.info("Página %d: %d produtos extraídos (total acumulado: %d)", pagina_atual, len(produtos), total_produtos)
             else:
-                logging.warning(f"Nenhum produto encontrado na página {pagina_atual}")
+                logger.warning(f"Nenhum produto encontrado na página {pagina_atual}")
                 
                 # Se não encontrou produtos, mas é a primeira página, tenta uma segunda página
                 if pagina_atual == 1:
                     teste_segunda_pagina = URL_BASE + "?p=2"
-                    logging.info(f"Tentando acessar a segunda página diretamente: {teste_segunda_pagina}")
+                    logger.info(f"Tentando acessar a segunda página diretamente: {teste_segunda_pagina}")
                     html_p2 = obter_pagina(teste_segunda_pagina)
                     
                     if html_p2:
                         # Salva a segunda página para debug
-                        debug_filename_p2 = f"{DEBUG_DIR}/debug_page_sebo_{data_hora}_p2_teste.html"
-                        with open(debug_filename_p2, "w", encoding="utf-8") as f:
-                            f.write(html_p2)
+                        salvar_html_debug(html_p2, "p2_teste")
                         
                         # Verifica se tem produtos na segunda página
                         produtos_p2 = extrair_produtos(html_p2)
                         if produtos_p2:
-                            logging.info(f"Encontrados {len(produtos_p2)} produtos na página 2 de teste")
+                            logger.info(f"Encontrados {len(produtos_p2)} produtos na página 2 de teste")
                             # Continua a partir da página 2
                             url = teste_segunda_pagina
                             pagina_atual = 2
                             continue
+                else:
+                    # Página vazia após a primeira: fim da listagem
+                    logger.info("Página sem produtos. Finalizando extração.")
+                    break
             
             # Verifica se há próxima página
-            next_url = obter_proxima_pagina(html, url)
+            next_url = obter_proxima_pagina(arvore, url)
             
             if next_url:
                 url = next_url
-                logging.info(f"Próxima página: {url}")
+                logger.info(f"Próxima página: {url}")
                 pagina_atual += 1
-                
-                # Pausa entre páginas
-                time.sleep(random.uniform(3, 5))
             else:
-                logging.info("Não foram encontradas mais páginas. Finalizando extração.")
+                logger.info("Não foram encontradas mais páginas. Finalizando extração.")
                 break
         
         # Finaliza a extração
         csv_file.close()
-        logging.info(f"Extração finalizada. Total de produtos: {total_produtos}")
+        logger.info(f"Extração finalizada. Total de produtos: {total_produtos}")
         return True
     
     except Exception as e:
-        logging.error(f"Erro na extração de produtos: {str(e)}")
+        logger.error(f"Erro na extração de produtos: {str(e)}")
         return False
+    finally:
+        # Descarta os downloads antecipados que não serão mais usados
+        executor.shutdown(wait=True, cancel_futures=True)
+        salvar_cache_etags()
 
 if __name__ == "__main__":
     try:
-        logging.info("Iniciando extração de produtos do Sebo do Messias")
+        logger.info("Iniciando extração de produtos do Sebo do Messias")
         sucesso = extrair_todos_produtos()
         
         if sucesso:
-            logging.info("Scraper concluído com sucesso")
+            logger.info("Scraper concluído com sucesso")
         else:
-            logging.error("Scraper finalizado com erros")
+            logger.error("Scraper finalizado com erros")
     
     except Exception as e:
-        logging.error(f"Erro fatal no scraper: {str(e)}") 
\ No newline at end of file
+        logger.error(f"Erro fatal no scraper: {str(e)}") 
\ No newline at end of file
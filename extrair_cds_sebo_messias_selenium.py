@@ -6,8 +6,15 @@ Scraper para o site Sebo do Messias usando Selenium
 Este script extrai informações de CDs do site https://sebodomessias.com.br/cds
 """
 
+import io
 import os
 import csv
+import gzip
+import json
+import hashlib
+import queue
+import atexit
+import threading
 import time
 import random
 import logging
@@ -15,15 +22,21 @@ import datetime
 import requests
 import platform
 import re
-from bs4 import BeautifulSoup
+import lxml.html
+from collections import namedtuple
+from lxml import etree
 from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
+from selenium.common.exceptions import TimeoutException
 from typing import List, Dict, Optional, Any, Union
 from webdriver_manager.chrome import ChromeDriverManager
 
@@ -44,26 +57,126 @@ logging.basicConfig(
 URL_BASE = "https://sebodomessias.com.br/cds"
 ARQUIVO_CSV = "produtos_cd_sebo_messias.csv"
 
+# Colunas do arquivo CSV
+CAMPOS_CSV = (
+    'titulo', 'artista', 'ano', 'conservacao',
+    'preco_original', 'preco_com_desconto', 'categoria', 'url', 'data_extracao'
+)
+# Produto na ordem das colunas do CSV: vai direto para writer.writerows
+# (tupla compacta, também mais barata de serializar entre processos)
+Produto = namedtuple('Produto', CAMPOS_CSV)
+
 # Verifica se a variável de ambiente DEBUG_DIR está definida
 DEBUG_DIR = os.environ.get('DEBUG_DIR', 'debug')
 
+# Dumps de HTML para debug só são gravados com SCRAPER_DEBUG=1
+SCRAPER_DEBUG = os.environ.get('SCRAPER_DEBUG') == '1'
+
+# Cache HTTP (ETag / Last-Modified) para requisições condicionais entre execuções
+CACHE_DIR = os.environ.get('CACHE_DIR', 'cache')
+os.makedirs(CACHE_DIR, exist_ok=True)
+ARQUIVO_CACHE_ETAGS = os.path.join(CACHE_DIR, 'sebo_messias_selenium_etags.json')
+
+# Marcador presente no HTML das páginas de listagem com produtos
+MARCADOR_PRODUTOS = 'rptVitrineColuna'
+
+# Número máximo de páginas baixadas ao mesmo tempo
+MAX_REQUISICOES_SIMULTANEAS = 8
+MAX_PAGINAS = 50  # Limite de segurança
+
+# Números de página nos links de paginação (?p=N, inclusive com &amp; no HTML)
+_PAGINA_RE = re.compile(r'[?&](?:amp;)?p=(\d+)')
+
+# A listagem é HTML estático: as páginas são baixadas via HTTP (keep-alive)
+# e o Selenium fica apenas como alternativa quando o HTML não traz os produtos
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+SESSION = requests.Session()
+SESSION.headers.update({
+    "User-Agent": USER_AGENT,
+    "Accept-Language": "pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7",
+    "Referer": "https://sebodomessias.com.br/"
+})
+# Pool de conexões do tamanho do número de downloads simultâneos, com novas tentativas
+# (respeitando Retry-After) para que um 429 ou erro temporário não encerre a paginação
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=MAX_REQUISICOES_SIMULTANEAS,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+# Dumps de debug são compactados e gravados por uma thread em segundo plano,
+# para não bloquear a navegação; a fila limitada evita acumular páginas na memória
+_FILA_DEBUG = queue.Queue(maxsize=64)
+_THREAD_DEBUG = None
+
+def _gravar_debug_em_segundo_plano():
+    """Consome a fila de dumps de debug, gravando cada página em disco"""
+    while True:
+        debug_filename, html = _FILA_DEBUG.get()
+        try:
+            with gzip.open(debug_filename, "wt", encoding="utf-8", compresslevel=1) as f:
+                f.write(html)
+            logging.info(f"Página salva para debug em: {debug_filename}")
+        except Exception as e:
+            logging.error(f"Erro ao salvar página de debug {debug_filename}: {str(e)}")
+        finally:
+            _FILA_DEBUG.task_done()
+
+def salvar_html_debug(html, url):
+    """Agenda o salvamento do HTML da página (compactado) para debug, se SCRAPER_DEBUG=1"""
+    global _THREAD_DEBUG
+    if not SCRAPER_DEBUG:
+        return
+    
+    if _THREAD_DEBUG is None:
+        _THREAD_DEBUG = threading.Thread(target=_gravar_debug_em_segundo_plano, name="debug-writer", daemon=True)
+        _THREAD_DEBUG.start()
+        # Aguarda a gravação dos dumps pendentes antes de encerrar o processo
+        atexit.register(_FILA_DEBUG.join)
+    
+    url_filename = url.replace('https://', '').replace('/', '_')
+    debug_filename = f"{DEBUG_DIR}/debug_page_sebo_selenium_{data_hora}_{url_filename}.html.gz"
+    _FILA_DEBUG.put((debug_filename, html))
+
+# URLs de produtos já gravados no CSV (execuções anteriores e a atual)
+URLS_VISTAS = set()
+
+def carregar_urls_existentes():
+    """Carrega a coluna 'url' do CSV existente para não gravar produtos repetidos"""
+    try:
+        with open(ARQUIVO_CSV, 'r', newline='', encoding='utf-8') as arquivo:
+            leitor = csv.reader(arquivo)
+            cabecalho = next(leitor, None)
+            if not cabecalho or 'url' not in cabecalho:
+                return
+            indice = cabecalho.index('url')
+            URLS_VISTAS.update(linha[indice] for linha in leitor if len(linha) > indice and linha[indice])
+        logging.info(f"Carregadas {len(URLS_VISTAS)} URLs de produtos já extraídos")
+    except Exception as e:
+        logging.error(f"Erro ao carregar URLs do arquivo existente: {str(e)}")
+
 def setup():
     """Configuração inicial e verificação do arquivo CSV"""
     logging.info("Iniciando scraper para o site Sebo do Messias com Selenium")
     
     # Verifica se o arquivo CSV já existe
     file_exists = os.path.isfile(ARQUIVO_CSV)
+    if file_exists:
+        carregar_urls_existentes()
+    else:
+        # CSV novo: todas as páginas precisam ser extraídas, mesmo as que não mudaram
+        CACHE_ETAGS.clear()
     
-    # Abre o arquivo CSV para escrita
-    csv_file = open(ARQUIVO_CSV, 'a', newline='', encoding='utf-8')
+    # Abre o arquivo CSV para escrita em modo append no nível do sistema operacional,
+    # com buffer binário grande: o conteúdo é gravado em disco uma vez por página (flush)
+    fd = os.open(ARQUIVO_CSV, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    buffer = io.BufferedWriter(io.FileIO(fd, 'wb'), buffer_size=1 << 20)
+    csv_file = io.TextIOWrapper(buffer, encoding='utf-8', newline='', write_through=False)
     writer = csv.writer(csv_file)
     
     # Escreve o cabeçalho se o arquivo não existir
     if not file_exists:
-        writer.writerow([
-            'titulo', 'artista', 'ano', 'conservacao', 
-            'preco_original', 'preco_com_desconto', 'categoria', 'url', 'data_extracao'
-        ])
+        writer.writerow(CAMPOS_CSV)
         logging.info("Arquivo CSV criado com cabeçalho")
     
     return csv_file, writer
@@ -79,11 +192,18 @@ def inicializar_driver():
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+        chrome_options.add_argument(f"--user-agent={USER_AGENT}")
         # Evitar detecção de automação
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option("useAutomationExtension", False)
+        # Só o HTML é lido: não baixa imagens, folhas de estilo nem fontes
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.stylesheets": 2,
+            "profile.managed_default_content_settings.fonts": 2
+        })
         
         # Usar o webdriver_manager para gerenciar o ChromeDriver
         driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
@@ -96,146 +216,381 @@ def inicializar_driver():
         logging.error(f"Erro ao inicializar o driver Selenium: {str(e)}")
         raise
 
-def acessar_pagina(driver, url):
-    """Acessa uma página usando o driver Selenium"""
+# Driver único do processo: criado sob demanda e reaproveitado entre extrações
+_DRIVER = None
+
+def _encerrar_driver():
+    """Fecha o navegador ao final do processo"""
+    global _DRIVER
+    if _DRIVER is not None:
+        try:
+            _DRIVER.quit()
+        except Exception as e:
+            logging.error(f"Erro ao encerrar o driver Selenium: {str(e)}")
+        _DRIVER = None
+
+def get_driver():
+    """Retorna o driver Selenium do processo, inicializando-o na primeira chamada"""
+    global _DRIVER
+    if _DRIVER is None:
+        _DRIVER = inicializar_driver()
+        atexit.register(_encerrar_driver)
+    return _DRIVER
+
+def reset_driver():
+    """Limpa cookies e localStorage do driver sem fechar o navegador"""
+    if _DRIVER is None:
+        return
     try:
-        logging.info(f"Acessando URL: {url}")
-        driver.get(url)
+        _DRIVER.delete_all_cookies()
+        _DRIVER.execute_script("window.localStorage.clear();")
+    except Exception as e:
+        logging.warning(f"Erro ao limpar o estado do driver Selenium: {str(e)}")
+
+def carregar_cache_etags():
+    """Carrega o cache de ETag/Last-Modified (e hash do conteúdo) por URL"""
+    try:
+        with open(ARQUIVO_CACHE_ETAGS, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.error(f"Erro ao carregar cache de ETags: {str(e)}")
+        return {}
+
+CACHE_ETAGS = carregar_cache_etags()
+
+def salvar_cache_etags():
+    """Persiste o cache de ETag/Last-Modified por URL"""
+    try:
+        with open(ARQUIVO_CACHE_ETAGS, 'w', encoding='utf-8') as f:
+            json.dump(CACHE_ETAGS, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        logging.error(f"Erro ao salvar cache de ETags: {str(e)}")
+
+# URLs de páginas que não mudaram desde a última execução (os produtos já estão no CSV)
+PAGINAS_INALTERADAS = set()
+
+# Entradas novas do cache (e o HTML correspondente) por URL, aguardando a gravação
+# dos produtos da página no CSV: páginas baixadas mas não processadas (download
+# adiantado, erro ou interrupção) não podem ser marcadas como inalteradas na
+# próxima execução, senão os seus produtos nunca seriam extraídos
+CACHE_ETAGS_PENDENTES = {}
+
+def confirmar_cache_pagina(url):
+    """Move a entrada pendente da página para o cache, depois que os produtos dela
+    foram gravados no CSV (ou já estavam lá, no caso de página inalterada)"""
+    pendente = CACHE_ETAGS_PENDENTES.pop(url, None)
+    if pendente is None:
+        return
+    entrada, html = pendente
+    try:
+        with open(entrada['html_path'], 'w', encoding='utf-8') as f:
+            f.write(html)
+        CACHE_ETAGS[url] = entrada
+    except OSError as e:
+        logging.error(f"Erro ao salvar HTML da página {url} no cache: {str(e)}")
+
+def obter_pagina_http(url):
+    """Obtém o HTML da página via requests (sem navegador), com requisição condicional"""
+    try:
+        logging.info(f"Acessando URL via HTTP: {url}")
         
-        # Aguarda o carregamento da página
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
+        # Usa os validadores da última execução para uma requisição condicional
+        headers = {}
+        entrada = CACHE_ETAGS.get(url)
+        if entrada and os.path.exists(entrada['html_path']):
+            if entrada.get('etag'):
+                headers['If-None-Match'] = entrada['etag']
+            if entrada.get('last_modified'):
+                headers['If-Modified-Since'] = entrada['last_modified']
         
-        # Pausa para garantir o carregamento completo
-        time.sleep(random.uniform(2, 4))
+        # Pausa aleatória por worker, para que os downloads simultâneos não saiam
+        # todos de uma vez e sobrecarreguem o servidor
+        time.sleep(random.uniform(1, 3))
         
-        # Captura o HTML da página
-        html = driver.page_source
+        response = SESSION.get(url, headers=headers, timeout=15)
         
-        # Salva o HTML para debug
-        url_filename = url.replace('https://', '').replace('/', '_')
-        debug_filename = f"{DEBUG_DIR}/debug_page_sebo_selenium_{data_hora}_{url_filename}.html"
-        with open(debug_filename, "w", encoding="utf-8") as f:
-            f.write(html)
-        logging.info(f"Página salva para debug em: {debug_filename}")
+        # Página não mudou desde a última execução: usa o HTML salvo
+        if response.status_code == 304:
+            logging.info(f"Página não modificada, usando cache: {url}")
+            PAGINAS_INALTERADAS.add(url)
+            with open(entrada['html_path'], 'r', encoding='utf-8') as f:
+                return f.read()
+        
+        response.raise_for_status()
+        html = response.text
+        
+        # Sem validadores no servidor, o hash do conteúdo indica se a página mudou
+        hash_conteudo = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+        if entrada and entrada.get('hash') == hash_conteudo:
+            logging.info(f"Conteúdo da página inalterado: {url}")
+            PAGINAS_INALTERADAS.add(url)
+        
+        # A entrada só vai para o cache em confirmar_cache_pagina, após a gravação da página
+        html_path = os.path.join(CACHE_DIR, f"sebo_messias_selenium_{hashlib.md5(url.encode('utf-8')).hexdigest()}.html")
+        CACHE_ETAGS_PENDENTES[url] = ({
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'hash': hash_conteudo,
+            'html_path': html_path
+        }, html)
         
         return html
+    except (requests.exceptions.RequestException, OSError) as e:
+        logging.error(f"Erro ao acessar a página {url} via HTTP: {str(e)}")
+        return None
+
+def url_pagina(numero):
+    """URL da página de listagem de número informado"""
+    return URL_BASE if numero == 1 else f"{URL_BASE}?p={numero}"
+
+def descobrir_ultima_pagina(html):
+    """Maior número de página referenciado nos links de paginação do HTML"""
+    return max((int(numero) for numero in _PAGINA_RE.findall(html)), default=1)
+
+def baixar_paginas(executor, numeros):
+    """Agenda o download das páginas em paralelo; os HTMLs são entregues na ordem dos
+    números, cada um assim que o seu download (e os anteriores) termina"""
+    return executor.map(obter_pagina_http, map(url_pagina, numeros))
+
+def acessar_pagina(driver, url):
+    """Acessa uma página usando o driver Selenium, retornando True se a página carregou"""
+    try:
+        logging.info(f"Acessando URL: {url}")
+        driver.get(url)
+        
+        # Aguarda apenas até os produtos aparecerem no DOM (sem pausa fixa)
+        try:
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, f'[id*="{MARCADOR_PRODUTOS}"]'))
+            )
+        except TimeoutException:
+            logging.warning(f"Produtos não apareceram na página {url} dentro do tempo limite")
+        
+        # Serializa o DOM apenas para o dump de debug (a extração é feita no navegador)
+        if SCRAPER_DEBUG:
+            salvar_html_debug(driver.page_source, url)
+        
+        return True
     
     except TimeoutException:
         logging.error(f"Timeout ao acessar a página {url}")
-        return None
+        return False
     except Exception as e:
         logging.error(f"Erro ao acessar a página {url}: {str(e)}")
-        return None
+        return False
+
+def verificar_proxima_pagina(driver, pagina_atual):
+    """Navega diretamente para a próxima página (?p=N) e indica se ela tem produtos"""
+    if not acessar_pagina(driver, url_pagina(pagina_atual + 1)):
+        return False
+    
+    # Uma única consulta ao DOM, com os mesmos marcadores usados na extração
+    return bool(driver.find_elements(By.CSS_SELECTOR, f'[id*="{MARCADOR_PRODUTOS}"], .product-details, .card-text'))
+
+def _xpath_classe(nome):
+    """Expressão XPath equivalente ao seletor CSS de classe (.nome)"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {nome} ')"
+
+def _primeiro(elemento, expressoes):
+    """Retorna o primeiro nó encontrado pela primeira expressão XPath (compilada) que tiver resultado"""
+    for expressao in expressoes:
+        resultado = expressao(elemento)
+        if resultado:
+            return resultado[0]
+    return None
+
+def _texto(elemento):
+    """Texto de um elemento (incluindo descendentes), sem espaços nas pontas"""
+    return elemento.text_content().strip()
+
+# Expressões compiladas uma única vez (evita recompilar regex/seletores a cada produto)
+_PRICE_CLEAN = re.compile(r'[^0-9,.]')
+# Trechos que aparecem no HTML de qualquer página com produtos (ver _ITENS_SEL)
+_MARCADORES_PRODUTO = (MARCADOR_PRODUTOS, 'product-details', 'card-text')
+_ITENS_SEL = (
+    etree.XPath("//div[contains(@id, 'rptVitrineColuna')]"),
+    etree.XPath(f"//*[{_xpath_classe('card-text')} or {_xpath_classe('product-details')}]"),
+)
+_TITLE_SEL = (
+    etree.XPath(".//a[contains(@href, 'cd')]"),
+    etree.XPath(".//h3//a"),
+)
+
+# Classificação dos descendentes de cada produto: (campo, prioridade) por classe e por tag.
+# Para cada campo vale o nó de menor prioridade (e o primeiro, em caso de empate).
+# Os preços também saem desta passada: consultas XPath por item (mesmo compiladas e
+# unidas) percorreriam a subárvore de novo só para eles
+_CAMPOS_POR_CLASSE = {
+    'price-old': ('preco_original', 0),
+    'price-new': ('preco_com_desconto', 0),
+    'category': ('categoria', 0),
+}
+_CAMPOS_POR_TAG = {
+    'del': ('preco_original', 1),
+    'ins': ('preco_com_desconto', 1),
+}
+
+def _ancestrais(no, item):
+    """Ancestrais de um nó dentro do item (sem incluir o próprio item)"""
+    for ancestral in no.iterancestors():
+        if ancestral is item:
+            return
+        yield ancestral
+
+def _classes_ancestrais(no, item):
+    """Conjunto das classes dos ancestrais de um nó dentro do item"""
+    return {classe for ancestral in _ancestrais(no, item) for classe in ancestral.get('class', '').split()}
+
+def _classificar_descendentes(item):
+    """Percorre a subárvore do produto uma única vez, separando os nós de cada campo"""
+    campos = {}
+    detalhes = []
+    detalhes_gerais = []
+    
+    def registrar(campo, prioridade, no):
+        atual = campos.get(campo)
+        if atual is None or prioridade < atual[0]:
+            campos[campo] = (prioridade, no)
+    
+    for no in item.iterdescendants():
+        tag = no.tag
+        if not isinstance(tag, str):
+            continue  # Comentários e instruções de processamento
+        
+        classes = no.get('class', '').split()
+        for classe in classes:
+            if classe in _CAMPOS_POR_CLASSE:
+                registrar(*_CAMPOS_POR_CLASSE[classe], no)
+        if tag in _CAMPOS_POR_TAG:
+            registrar(*_CAMPOS_POR_TAG[tag], no)
+        
+        if 'price' in classes:
+            classes_ancestrais = _classes_ancestrais(no, item)
+            if 'old-price' in classes_ancestrais:
+                registrar('preco_original', 2, no)
+            if 'special-price' in classes_ancestrais:
+                registrar('preco_com_desconto', 2, no)
+            registrar('preco_com_desconto', 3, no)
+        
+        if tag == 'a':
+            href = no.get('href')
+            if href is not None and 'cd' in href:
+                registrar('titulo', 0, no)
+            elif any(ancestral.tag == 'h3' for ancestral in _ancestrais(no, item)):
+                registrar('titulo', 1, no)
+        elif tag == 'li':
+            detalhes_gerais.append(no)
+            if 'product-details' in _classes_ancestrais(no, item):
+                detalhes.append(no)
+        
+        if 'lblResponsavel' in no.get('id', ''):
+            registrar('artista', 0, no)
+    
+    return {campo: no for campo, (_, no) in campos.items()}, detalhes or detalhes_gerais
+
+def _montar_produto(textos):
+    """Monta o produto a partir dos textos brutos encontrados no item (HTML ou navegador)"""
+    href = textos['href']
+    url = urljoin(URL_BASE, href) if href is not None else ""
+    
+    titulo = textos['titulo'] or "Sem título"
+    if titulo == "Sem título" and url:
+        # Tenta extrair o título da URL
+        titulo = url.split('/')[-1].replace('-', ' ').title()
+    
+    # Busca por detalhes do produto
+    artista = textos['artista'] if textos['artista'] is not None else "Não disponível"
+    ano = "Não disponível"
+    conservacao = "Não disponível"
+    categoria = textos['categoria'] if textos['categoria'] is not None else "CD"
+    
+    # Tenta extrair informações de outros detalhes
+    for texto in textos['detalhes']:
+        if "Artista:" in texto or "Responsável:" in texto:
+            artista = texto.split(':', 1)[1].strip() if ':' in texto else texto
+        elif "Ano:" in texto:
+            ano = texto.split(':', 1)[1].strip() if ':' in texto else texto
+        elif "Conservação:" in texto or "Estado:" in texto:
+            conservacao = texto.split(':', 1)[1].strip() if ':' in texto else texto
+    
+    # Preços: limpa o texto para extrair apenas o valor
+    preco_original = "Não disponível"
+    if textos['preco_original'] is not None:
+        preco_original = _PRICE_CLEAN.sub('', textos['preco_original'])
+    
+    preco_com_desconto = "Não disponível"
+    if textos['preco_com_desconto'] is not None:
+        preco_com_desconto = _PRICE_CLEAN.sub('', textos['preco_com_desconto'])
+    
+    logging.info(f"Produto extraído: {titulo}")
+    
+    return Produto(
+        titulo, artista, ano, conservacao, preco_original,
+        preco_com_desconto, categoria, url,
+        datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    )
 
 def extrair_produtos(html):
     """Extrai informações dos produtos da página"""
     produtos = []
+    
+    # Sem nenhum dos marcadores de produto no HTML bruto não há o que extrair:
+    # evita montar a árvore para páginas vazias ou de erro
+    if not any(marcador in html for marcador in _MARCADORES_PRODUTO):
+        logging.warning("Nenhum marcador de produto encontrado no HTML da página")
+        return produtos
+    
     try:
-        soup = BeautifulSoup(html, 'html.parser')
+        tree = lxml.html.fromstring(html)
         
         # Encontrar os produtos usando o seletor específico do Sebo do Messias
         # Estamos procurando por elementos com ID que contém 'rptVitrineColuna'
-        itens_produtos = soup.find_all(lambda tag: tag.name == 'div' and 
-                                              tag.get('id') and 
-                                              'rptVitrineColuna' in tag.get('id'))
+        itens_produtos = _ITENS_SEL[0](tree)
         
         if not itens_produtos:
             logging.warning("Container de produtos não encontrado na página")
-            # Tenta uma abordagem alternativa
-            itens_produtos = soup.select('[id*="rptVitrineColuna"]')
-            
-            if not itens_produtos:
-                # Última tentativa - procura por qualquer elemento que pareça um produto
-                itens_produtos = soup.select('.card-text, .product-details')
+            # Última tentativa - procura por qualquer elemento que pareça um produto
+            itens_produtos = _ITENS_SEL[1](tree)
         
         logging.info(f"Encontrados {len(itens_produtos)} produtos potenciais na página")
         
         # Extrai informações de cada produto
         for idx, item in enumerate(itens_produtos):
             try:
+                # Classifica os nós do produto numa única passada pela subárvore
+                campos, detalhes_lista = _classificar_descendentes(item)
+                
                 # Busca pelo título e URL do produto
-                titulo_elem = item.select_one('a[href*="cd"]') or item.select_one('h3 a')
-                if not titulo_elem:
+                titulo_elem = campos.get('titulo')
+                if titulo_elem is None:
                     # Tenta procurar no contexto maior
-                    parent = item.parent
-                    titulo_elem = parent.select_one('a[href*="cd"]') or parent.select_one('h3 a')
+                    parent = item.getparent()
+                    titulo_elem = _primeiro(parent, _TITLE_SEL)
                 
-                if not titulo_elem:
+                if titulo_elem is None:
                     continue
                 
-                titulo = titulo_elem.get_text().strip() if titulo_elem.get_text() else "Sem título"
-                if not titulo or titulo == "Sem título":
-                    # Tenta extrair o título da URL
-                    url = urljoin(URL_BASE, titulo_elem['href']) if 'href' in titulo_elem.attrs else ""
-                    if url:
-                        parts = url.split('/')
-                        if len(parts) > 0:
-                            titulo = parts[-1].replace('-', ' ').title()
-                
-                url = urljoin(URL_BASE, titulo_elem['href']) if 'href' in titulo_elem.attrs else ""
-                
-                # Busca por detalhes do produto
-                artista = "Não disponível"
-                ano = "Não disponível"
-                conservacao = "Não disponível"
-                categoria = "CD"
-                
-                # Tenta extrair o artista
-                artista_elem = item.select_one('[id*="lblResponsavel"]')
-                if artista_elem and artista_elem.next_sibling and artista_elem.next_sibling.next_sibling:
-                    artista = artista_elem.next_sibling.next_sibling.get_text().strip()
+                # O valor do artista fica no elemento seguinte ao rótulo
+                artista_elem = campos.get('artista')
+                if artista_elem is not None:
+                    artista_elem = artista_elem.getnext()
                 
-                # Tenta extrair categoria
-                categoria_elem = item.select_one('.category') or item.select_one('ul.category li')
-                if categoria_elem:
-                    categoria = categoria_elem.get_text().strip()
-                
-                # Tenta extrair informações de outros detalhes
-                detalhes_lista = item.select('.product-details li') or item.select('li')
-                for detalhe in detalhes_lista:
-                    texto = detalhe.get_text().strip()
-                    if "Artista:" in texto or "Responsável:" in texto:
-                        artista = texto.split(':', 1)[1].strip() if ':' in texto else texto
-                    elif "Ano:" in texto:
-                        ano = texto.split(':', 1)[1].strip() if ':' in texto else texto
-                    elif "Conservação:" in texto or "Estado:" in texto:
-                        conservacao = texto.split(':', 1)[1].strip() if ':' in texto else texto
-                
-                # Busca por preços
-                preco_original = "Não disponível"
-                preco_com_desconto = "Não disponível"
-                
-                # Preço original (pode estar em span.price-old)
-                preco_original_elem = item.select_one('.price-old') or item.select_one('del') or item.select_one('.old-price .price')
-                if preco_original_elem:
-                    preco_original = preco_original_elem.get_text().strip()
-                    # Limpa o texto para extrair apenas o valor
-                    preco_original = re.sub(r'[^0-9,.]', '', preco_original)
-                
-                # Preço com desconto (pode estar em span.price-new)
-                preco_desconto_elem = item.select_one('.price-new') or item.select_one('ins') or item.select_one('.special-price .price') or item.select_one('.price')
-                if preco_desconto_elem:
-                    preco_com_desconto = preco_desconto_elem.get_text().strip()
-                    # Limpa o texto para extrair apenas o valor
-                    preco_com_desconto = re.sub(r'[^0-9,.]', '', preco_com_desconto)
-                
-                # Adiciona o produto à lista
-                produto = {
-                    'titulo': titulo,
-                    'artista': artista,
-                    'ano': ano,
-                    'conservacao': conservacao,
-                    'preco_original': preco_original,
-                    'preco_com_desconto': preco_com_desconto,
-                    'categoria': categoria,
-                    'url': url,
-                    'data_extracao': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                textos = {
+                    'titulo': _texto(titulo_elem),
+                    'href': titulo_elem.get('href'),
+                    'detalhes': [_texto(detalhe) for detalhe in detalhes_lista],
                 }
+                for campo, elemento in (
+                    ('artista', artista_elem),
+                    ('categoria', campos.get('categoria')),
+                    ('preco_original', campos.get('preco_original')),
+                    ('preco_com_desconto', campos.get('preco_com_desconto')),
+                ):
+                    textos[campo] = _texto(elemento) if elemento is not None else None
                 
-                produtos.append(produto)
-                logging.info(f"Produto extraído: {titulo}")
+                produtos.append(_montar_produto(textos))
             
             except Exception as e:
                 logging.error(f"Erro ao extrair produto {idx}: {str(e)}")
@@ -247,154 +602,175 @@ def extrair_produtos(html):
         logging.error(f"Erro ao extrair produtos da página: {str(e)}")
         return []
 
-def verificar_proxima_pagina(driver, pagina_atual):
-    """Verifica se existe próxima página e retorna True se conseguir acessá-la"""
+# Extração no próprio navegador: uma única chamada execute_script por página devolve
+# os textos brutos de todos os produtos (mesmos seletores e prioridades do lxml)
+_JS_EXTRAIR_PRODUTOS = """
+const primeiro = (raiz, seletores) => {
+    for (const seletor of seletores) {
+        const el = raiz.querySelector(seletor);
+        if (el) return el;
+    }
+    return null;
+};
+const texto = (el) => el ? el.textContent.trim() : null;
+
+let itens = document.querySelectorAll('div[id*="rptVitrineColuna"]');
+if (!itens.length) itens = document.querySelectorAll('.card-text, .product-details');
+
+// :scope limita os seletores compostos à subárvore do item, como nas expressões XPath
+const seletoresTitulo = ['a[href*="cd"]', ':scope h3 a'];
+return Array.from(itens, (item) => {
+    let titulo = primeiro(item, seletoresTitulo);
+    if (!titulo && item.parentElement) titulo = primeiro(item.parentElement, seletoresTitulo);
+    if (!titulo) return null;
+    
+    const rotuloArtista = item.querySelector('[id*="lblResponsavel"]');
+    let detalhes = item.querySelectorAll(':scope .product-details li');
+    if (!detalhes.length) detalhes = item.querySelectorAll('li');
+    
+    return {
+        titulo: texto(titulo),
+        href: titulo.getAttribute('href'),
+        artista: rotuloArtista ? texto(rotuloArtista.nextElementSibling) : null,
+        categoria: texto(item.querySelector('.category')),
+        detalhes: Array.from(detalhes, texto),
+        preco_original: texto(primeiro(item, ['.price-old', 'del', ':scope .old-price .price'])),
+        preco_com_desconto: texto(primeiro(item, ['.price-new', 'ins', ':scope .special-price .price', '.price']))
+    };
+}).filter((produto) => produto !== null);
+"""
+
+def extrair_produtos_driver(driver):
+    """Extrai os produtos da página aberta no driver, sem serializar e reprocessar o HTML"""
     try:
-        # Tenta encontrar o elemento de paginação
-        paginacao = None
-        try:
-            paginacao = WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, '.pagination, .pager, [id*="paginacao"]'))
-            )
-        except TimeoutException:
-            # Tenta encontrar os elementos <a> de paginação numerada
-            try:
-                # Busca por links de paginação específicos do site
-                proxima_pagina = pagina_atual + 1
-                xpath_pagina = f"//a[contains(@href, '?p={proxima_pagina}') or contains(@href, 'page={proxima_pagina}') or contains(text(), '{proxima_pagina}')]"
-                links_paginacao = driver.find_elements(By.XPATH, xpath_pagina)
-                
-                if links_paginacao:
-                    logging.info(f"Link direto para página {proxima_pagina} encontrado")
-                    links_paginacao[0].click()
-                    time.sleep(random.uniform(3, 5))
-                    return True
-            except Exception as e:
-                logging.error(f"Erro ao buscar links de paginação numerada: {str(e)}")
-        
-        # Se encontrou o elemento de paginação principal
-        if paginacao:
-            # Busca pelo link "Próximo"/"Next" ou similar
-            next_links = paginacao.find_elements(By.XPATH, ".//a[contains(text(), 'Next') or contains(text(), 'Próximo') or contains(text(), 'Próxima') or contains(text(), '>')]")
-            
-            if next_links:
-                logging.info(f"Link para próxima página encontrado após a página {pagina_atual}")
-                next_links[0].click()
-                time.sleep(random.uniform(3, 5))
-                return True
-            
-            # Alternativa: busca pelo número da próxima página
-            proxima_pagina = pagina_atual + 1
-            page_links = paginacao.find_elements(By.TAG_NAME, "a")
-            
-            for link in page_links:
-                try:
-                    if link.text.strip() == str(proxima_pagina):
-                        logging.info(f"Link para página {proxima_pagina} encontrado")
-                        link.click()
-                        time.sleep(random.uniform(3, 5))
-                        return True
-                except (ValueError, StaleElementReferenceException):
-                    continue
-        
-        # Se não encontrou links de paginação, tenta uma abordagem direta
-        try:
-            # Tenta acessar a próxima página diretamente pela URL
-            next_url = f"{URL_BASE}?p={proxima_pagina}"
-            logging.info(f"Tentando acessar diretamente a URL: {next_url}")
-            driver.get(next_url)
-            
-            # Verifica se a página carregou corretamente
-            WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            # Verifica se tem produtos na página
-            produtos_container = driver.find_elements(By.CSS_SELECTOR, '[id*="rptVitrineColuna"], .product-details')
-            if produtos_container:
-                logging.info(f"Próxima página {proxima_pagina} acessada diretamente via URL")
-                return True
-            else:
-                logging.info(f"Próxima página {proxima_pagina} acessada, mas não contém produtos")
-                return False
-        
-        except (TimeoutException, NoSuchElementException) as e:
-            logging.info(f"Não foi possível acessar a próxima página {proxima_pagina} diretamente: {str(e)}")
-            return False
-        
-        return False
+        dados = driver.execute_script(_JS_EXTRAIR_PRODUTOS) or []
+        logging.info(f"Encontrados {len(dados)} produtos na página (navegador)")
+        return [_montar_produto(textos) for textos in dados]
     
     except Exception as e:
-        logging.error(f"Erro ao verificar próxima página: {str(e)}")
-        return False
+        logging.error(f"Erro ao extrair produtos da página no navegador: {str(e)}")
+        return []
 
 def salvar_produtos(writer, produtos):
     """Salva os produtos no arquivo CSV"""
-    for produto in produtos:
-        writer.writerow([
-            produto['titulo'],
-            produto['artista'],
-            produto['ano'],
-            produto['conservacao'],
-            produto['preco_original'],
-            produto['preco_com_desconto'],
-            produto['categoria'],
-            produto['url'],
-            produto['data_extracao']
-        ])
+    writer.writerows(produtos)
     
     logging.info(f"Salvos {len(produtos)} produtos no CSV")
 
+def pagina_com_produtos(html):
+    """Indica se o HTML baixado é uma página de listagem com produtos"""
+    return bool(html) and MARCADOR_PRODUTOS in html
+
+def processar_pagina(csv_file, writer, produtos, pagina_atual):
+    """Salva os produtos extraídos de uma página, retornando quantos foram salvos
+    (os já gravados nesta ou em execuções anteriores não são contados)"""
+    logging.info(f"Processando página {pagina_atual}")
+    
+    novos = []
+    if produtos:
+        # Descarta produtos já gravados (nesta ou em execuções anteriores)
+        for produto in produtos:
+            url = produto.url
+            if url:
+                if url in URLS_VISTAS:
+                    continue
+                URLS_VISTAS.add(url)
+            novos.append(produto)
+        
+        if novos:
+            salvar_produtos(writer, novos)
+            csv_file.flush()
+        logging.info(f"{len(novos)} produtos novos de {len(produtos)} na página {pagina_atual}")
+    else:
+        logging.warning(f"Nenhum produto encontrado na página {pagina_atual}")
+    
+    return len(novos)
+
 def extrair_todos_produtos():
     """Função principal que coordena a extração de produtos de todas as páginas"""
     try:
         # Configuração inicial
         csv_file, writer = setup()
-        driver = inicializar_driver()
+        driver = None
+        executor = ThreadPoolExecutor(max_workers=MAX_REQUISICOES_SIMULTANEAS)
         
         pagina_atual = 1
         total_produtos = 0
-        max_paginas = 50  # Limite de segurança
         
         try:
-            # Acessa a página inicial
-            html = acessar_pagina(driver, URL_BASE)
+            # Acessa a página inicial via HTTP; usa o Selenium só se o HTML não trouxer os produtos
+            html = obter_pagina_http(URL_BASE)
+            usar_selenium = not pagina_com_produtos(html)
             
-            if not html:
-                logging.error("Não foi possível acessar a página inicial")
-                return False
-            
-            # Loop pelas páginas
-            while pagina_atual <= max_paginas:
-                logging.info(f"Processando página {pagina_atual}")
-                
-                # Extrai produtos da página atual
-                produtos = extrair_produtos(driver.page_source)
+            if usar_selenium:
+                logging.info("Produtos não encontrados no HTML estático, usando o Selenium")
+                driver = get_driver()
+                if not acessar_pagina(driver, URL_BASE):
+                    logging.error("Não foi possível acessar a página inicial")
+                    return False
                 
-                if produtos:
-                    # Salva os produtos encontrados
-                    salvar_produtos(writer, produtos)
-                    total_produtos += len(produtos)
-                    logging.info(f"Total acumulado de produtos: {total_produtos}")
-                else:
-                    logging.warning(f"Nenhum produto encontrado na página {pagina_atual}")
-                
-                # Verifica se existe próxima página
-                if verificar_proxima_pagina(driver, pagina_atual):
+                # Navegação sequencial pela URL de cada página no navegador
+                while pagina_atual <= MAX_PAGINAS:
+                    total_produtos += processar_pagina(csv_file, writer, extrair_produtos_driver(driver), pagina_atual)
+                    
+                    if pagina_atual == MAX_PAGINAS or not verificar_proxima_pagina(driver, pagina_atual):
+                        logging.info("Não há mais páginas disponíveis")
+                        break
                     pagina_atual += 1
-                else:
-                    logging.info("Não há mais páginas disponíveis")
-                    break
+            else:
+                # As páginas seguintes (?p=N) são baixadas em paralelo, em lotes que vão
+                # até a maior página referenciada na paginação da última página processada.
+                # Cada página é enviada para extração (CPU) num processo separado assim que
+                # chega, sobrepondo a análise aos downloads ainda em andamento; a escrita
+                # no CSV continua no processo principal, na ordem das páginas
+                with Pool(processes=os.cpu_count()) as pool:
+                    paginas = [html]
+                    while True:
+                        pendentes = []  # (número da página, extração agendada ou None se inalterada)
+                        ultimo_html = None
+                        fim = False
+                        
+                        for html_pagina in paginas:
+                            if not pagina_com_produtos(html_pagina):
+                                fim = True
+                                break
+                            numero = pagina_atual + len(pendentes)
+                            if url_pagina(numero) in PAGINAS_INALTERADAS:
+                                # Página inalterada desde a última execução: não é extraída
+                                pendentes.append((numero, None))
+                            else:
+                                pendentes.append((numero, pool.apply_async(extrair_produtos, (html_pagina,))))
+                            ultimo_html = html_pagina
+                        
+                        for numero, extracao in pendentes:
+                            if extracao is None:
+                                logging.info(f"Página {numero} não mudou desde a última execução, extração ignorada")
+                            else:
+                                total_produtos += processar_pagina(csv_file, writer, extracao.get(), numero)
+                                logging.info(f"Total acumulado de produtos: {total_produtos}")
+                            # Produtos da página já estão no CSV (gravados e com flush)
+                            confirmar_cache_pagina(url_pagina(numero))
+                        pagina_atual += len(pendentes)
+                        
+                        if fim or ultimo_html is None:
+                            break
+                        
+                        ultima_pagina = min(descobrir_ultima_pagina(ultimo_html), MAX_PAGINAS)
+                        paginas = baixar_paginas(executor, range(pagina_atual, ultima_pagina + 1))
             
             logging.info(f"Extração finalizada. Total de produtos: {total_produtos}")
             return True
         
         finally:
-            # Fecha o driver e o arquivo CSV
+            # Limpa o estado do driver (que continua aberto para a próxima extração) e fecha o CSV
             if driver:
-                driver.quit()
+                reset_driver()
             
+            # Descarta os downloads que não serão mais usados
+            executor.shutdown(wait=True, cancel_futures=True)
             csv_file.close()
+            # Persiste apenas as entradas confirmadas (páginas gravadas no CSV)
+            salvar_cache_etags()
     
     except Exception as e:
         logging.error(f"Erro na extração de produtos: {str(e)}")
@@ -14,8 +14,16 @@ import random
 import logging
 import datetime
 import re
-from typing import List, Dict, Optional, Any, Union
-from urllib.parse import urljoin, urlparse, parse_qs
+import json
+import io
+import functools
+import operator
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Any, Union, Iterator
+from urllib.parse import urljoin, urlparse, parse_qs, parse_qsl, quote_plus
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -23,7 +31,7 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-import tempfile
+import atexit
 from dotenv import load_dotenv  # Nova importação para carregar variáveis de ambiente
 
 # Carrega as variáveis de ambiente do arquivo .env
@@ -36,6 +44,15 @@ os.makedirs('debug', exist_ok=True)
 # Verificar se existe uma variável de ambiente para o diretório de debug
 DEBUG_DIR = os.environ.get('DEBUG_DIR', 'debug')
 
+# Cabeçalho do CSV de saída, compartilhado por todas as gravações (inclusive dos produtos dummy)
+CAMPOS_CSV = ('id', 'titulo', 'artista', 'preco', 'categoria', 'vendedor', 'url', 'timestamp')
+# Extrai de um produto a tupla de valores na ordem do cabeçalho
+_VALORES_CSV = operator.itemgetter(*CAMPOS_CSV)
+
+# Diretório dos caches persistidos entre execuções
+CACHE_DIR = os.environ.get('CACHE_DIR', 'cache')
+os.makedirs(CACHE_DIR, exist_ok=True)
+
 # Configuração do logger
 data_hora = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 LOG_FILENAME = f"logs/scraper_shopee_{data_hora}.log"
@@ -51,11 +68,213 @@ logging.basicConfig(
 
 logger = logging.getLogger('scraper_shopee')
 
+def _regex_termos(*termos: str) -> re.Pattern:
+    """Compila uma alternância de termos literais (busca por substring, em uma única passada)"""
+    return re.compile("|".join(re.escape(termo) for termo in termos))
+
+# Na Shopee, às vezes a estrutura do DOM pode variar. Vamos tentar diferentes seletores
+# (atualizados com base na estrutura atual do site da Shopee)
+_SELETORES_PRODUTO = (
+    ".shopee-search-item-result__item",
+    ".col-xs-2-4",
+    "div[data-sqe='item']",
+    ".vN6sSJ",
+    ".O6wiAW",
+    ".UE17k8",
+    "div.shop-search-result-view__item",
+    ".mEwYy6",
+    ".EPRXcr"
+)
+# Todos os seletores de produto em um único seletor CSS
+_SELETOR_QUALQUER_PRODUTO = ", ".join(_SELETORES_PRODUTO)
+# Seção exibida pela Shopee quando não há resultados (ex.: paginação além do fim)
+_SELETOR_SEM_RESULTADOS = ".shopee-search-empty-result-section"
+# Seletores para nome e preço do produto (dentro do elemento do produto)
+_SELETORES_NOME = (".Ms6aG0", ".ie3A+n", ".ZV6pse", "div[data-sqe='name']", ".KZ8jpR")
+_SELETORES_PRECO = (".JXPQYt", "._0ZJOIv", ".nSU4nsX", "div[data-sqe='price']", ".WTFwws")
+
+# IDs da loja e do item nas URLs de produto da Shopee (ex.: ...-i.123.456)
+_SHOPEE_ID_RE = re.compile(r'i\.(\d+)\.(\d+)')
+
+# Termos usados por _is_cd, compilados uma única vez (títulos já em minúsculas)
+# Frases específicas que indicam que o produto é um CD
+_CD_RE = _regex_termos(
+    'cd ', 'cd-', '[cd]', '(cd)', ' cd', 'álbum cd', 'album cd',
+    'compact disc', 'box cd', 'cd box', 'cdbox', 'cd single',
+    'audio cd', 'áudio cd', 'cd audio', 'cd de música', 'cd de musica',
+    'cd musical', 'cd original', 'cd lacrado', 'cd novo',
+    'disco compacto', 'coletânea cd', 'coletanea cd'
+)
+# Termos que indicam outro tipo de produto...
+_CD_EXCLUSAO_RE = _regex_termos(
+    'cabo', 'controle', 'caixa', 'acessório', 'acessorio',
+    'case', 'estojo', 'suporte', 'dvd', 'notebook', 'player',
+    'laptop', 'hd', 'ssd', 'pendrive', 'mouse', 'fone',
+    'headset', 'pc'
+)
+# ...a menos que o título confirme que se trata de música
+_CD_CONFIRMACAO_RE = _regex_termos('banda', 'artista', 'cantor', 'álbum', 'album', 'música', 'musica', 'rock')
+# Gêneros musicais comuns junto com indicações de ser uma mídia física
+_GENEROS_RE = _regex_termos('rock', 'pop', 'mpb', 'samba', 'jazz', 'blues', 'hip hop', 'rap', 'funk', 'sertanejo', 'gospel')
+_TERMOS_MIDIA_RE = _regex_termos('álbum', 'album', 'disco', 'single', 'faixa', 'banda', 'lançamento')
+# Artistas famosos junto com indicações de mídia física
+_ARTISTAS_FAMOSOS_RE = _regex_termos('madonna', 'michael jackson', 'queen', 'beatles', 'u2', 'metallica')
+_MIDIA_ARTISTAS_RE = _regex_termos('álbum', 'album', 'single', 'remix', 'versão', 'versao', 'edição', 'edicao')
+
+# Artistas conhecidos usados por _extrair_artista, em ordem de prioridade
+_ARTISTAS_CONHECIDOS = (
+    "Madonna", "Michael Jackson", "Queen", "Beatles", "U2", "Metallica",
+    "AC/DC", "Pink Floyd", "Rolling Stones", "Led Zeppelin", "Black Sabbath",
+    "Elvis Presley", "Bob Dylan", "David Bowie", "Prince", "Nirvana",
+    "Bruce Springsteen", "The Police", "Dire Straits", "Guns N' Roses",
+    "Iron Maiden", "Aerosmith", "Deep Purple", "Kiss", "Bon Jovi",
+    "Red Hot Chili Peppers", "Pearl Jam", "Radiohead", "Coldplay",
+    "Roberto Carlos", "Caetano Veloso", "Gilberto Gil", "Tim Maia",
+    "Djavan", "Lulu Santos", "Legião Urbana", "Paralamas do Sucesso",
+    "Titãs", "Barão Vermelho", "Capital Inicial", "Skank", "Jota Quest"
+)
+# Todos os artistas em uma única passada pelo título; o nome não pode estar
+# colado a outra letra (mesma verificação de isalpha() feita antes, por artista).
+# Não usa \b: para \b, dígitos e "_" também fazem parte da palavra, o que
+# mudaria o resultado (ex.: "U2" em "CD U2_Live"). A prioridade pela ordem da
+# lista também é mantida, por isso finditer e não um único search.
+_ARTISTAS_CONHECIDOS_RE = re.compile(
+    r"(?<![^\W\d_])(?:" + "|".join(re.escape(artista.lower()) for artista in _ARTISTAS_CONHECIDOS) + r")(?![^\W\d_])"
+)
+# Mapeamento de palavras-chave para categorias, usado por _extrair_categoria
+# (em ordem de prioridade). Com ~30 palavras curtas e títulos curtos, os testes
+# "palavra in titulo" (busca de substring em C) saem mais baratos do que uma
+# alternância única do módulo re, com ou sem grupos nomeados
+_CATEGORIAS = (
+    ('rock', ('rock', 'metal', 'punk', 'grunge')),
+    ('pop', ('pop', 'pop music')),
+    ('mpb', ('mpb', 'música popular brasileira', 'musica popular brasileira')),
+    ('samba', ('samba', 'pagode', 'axé', 'axe')),
+    ('jazz', ('jazz', 'blues')),
+    ('clássica', ('clássica', 'classica', 'classical', 'orchestra')),
+    ('hip hop', ('hip hop', 'rap', 'hip-hop', 'trap')),
+    ('eletrônica', ('eletrônica', 'eletronica', 'electronic', 'dance', 'techno')),
+    ('reggae', ('reggae', 'ska')),
+    ('country', ('country', 'folk', 'sertanejo'))
+)
+
+@functools.lru_cache(maxsize=4096)
+def _categorizar(titulo_lower: str) -> str:
+    """Categoria do CD a partir do título em minúsculas (títulos repetidos vêm do cache)"""
+    for categoria, keywords in _CATEGORIAS:
+        for keyword in keywords:
+            if keyword in titulo_lower:
+                return categoria
+    
+    return "Outros"  # Categoria padrão
+
+# Palavras que indicam que o trecho do título descreve o disco, e não o artista
+_PALAVRAS_CD = ("cd", "álbum", "album", "disco")
+# Padrões como "do Artista", "by Artista", "de Artista" em "CD Nome do Álbum do Artista"
+_PREPOSICOES_ARTISTA = (" do ", " by ", " de ", " por ", " with ")
+_PRIORIDADE_ARTISTAS = {artista.lower(): (indice, artista) for indice, artista in enumerate(_ARTISTAS_CONHECIDOS)}
+
+class _LimitadorTaxa:
+    """
+    Espaça as requisições feitas à Shopee: no máximo uma a cada `intervalo`
+    segundos (mais uma variação aleatória), compartilhado entre threads.
+    O tempo gasto processando uma página conta para o intervalo da próxima.
+    """
+    
+    def __init__(self, intervalo: float, variacao: float = 0.0) -> None:
+        self.intervalo = intervalo
+        self.variacao = variacao
+        self._proxima = 0.0
+        self._lock = threading.Lock()
+    
+    def aguardar(self) -> None:
+        """Bloqueia até a vez desta requisição"""
+        with self._lock:
+            agora = time.monotonic()
+            espera = self._proxima - agora
+            # Reserva o horário desta requisição e agenda o da seguinte
+            self._proxima = max(agora, self._proxima) + self.intervalo + random.uniform(0.0, self.variacao)
+        if espera > 0:
+            time.sleep(espera)
+
 class ShopeeScraperSelenium:
     """Classe para extrair informações de CDs da Shopee utilizando Selenium"""
     
     BASE_URL = "https://shopee.com.br"
     DEFAULT_OUTPUT = "produtos_cd_shopee.csv"
+    # Perfil do Chrome mantido entre execuções (cache HTTP, DNS e service workers aquecidos)
+    CHROME_PROFILE_DIR = os.path.join(".cache", "chrome-profile")
+    
+    # Páginas processadas há menos de VALIDADE_CACHE_PAGINAS segundos não são buscadas de novo
+    ARQUIVO_CACHE_PAGINAS = os.path.join(CACHE_DIR, "shopee_paginas.json")
+    VALIDADE_CACHE_PAGINAS = 6 * 60 * 60
+    
+    # API JSON da loja (caminho rápido: sem renderizar as páginas no navegador)
+    API_DETALHE_LOJA = "/api/v4/shop/get_shop_detail"
+    API_BUSCA_LOJA = "/api/v4/shop/search_items"
+    ITENS_POR_PAGINA_API = 30
+    MAX_REQUISICOES_API = 10
+    INTERVALO_API = 0.5  # segundos entre requisições à API (somando todas as threads)
+    
+    # Padrões de URL bloqueados no navegador (recursos que não afetam a extração)
+    URLS_BLOQUEADAS = (
+        "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg", "*.ico",
+        "*.woff", "*.woff2", "*.ttf", "*.otf", "*.css", "*.mp4", "*.webm"
+    )
+    
+    # Extrai nome, preço e link de todos os produtos da página em uma única chamada
+    # ao navegador. Argumentos: seletores de produto, de nome, de preço e o link padrão.
+    # Sem seletor de produto correspondente, usa os links de produto da página.
+    JS_EXTRAIR_PRODUTOS = """
+        const [seletoresProduto, seletoresNome, seletoresPreco, linkPadrao] = arguments;
+        const textoDe = (raiz, seletores) => {
+            for (const seletor of seletores) {
+                const el = raiz.querySelector(seletor);
+                const texto = el ? el.innerText.trim() : '';
+                if (texto) return texto;
+            }
+            return null;
+        };
+        
+        let seletor = null;
+        let elementos = [];
+        for (const s of seletoresProduto) {
+            elementos = document.querySelectorAll(s);
+            if (elementos.length) { seletor = s; break; }
+        }
+        if (!elementos.length) elementos = document.querySelectorAll('a[href*="/product/"]');
+        
+        const itens = Array.from(elementos, (el) => {
+            let link = '';
+            const ancora = el.querySelector('a');
+            if (ancora) {
+                link = ancora.href;
+            } else {
+                const clicavel = el.querySelector('[href], [onclick]');
+                if (clicavel) link = clicavel.href || clicavel.getAttribute('href') || linkPadrao;
+            }
+            const pai = el.parentElement;
+            if (!link && pai) link = pai.href || pai.getAttribute('href') || '';
+            return {nome: textoDe(el, seletoresNome), preco: textoDe(el, seletoresPreco), link: link};
+        });
+        return {seletor: seletor, itens: itens};
+    """
+    
+    # Rola até o fim da página até a quantidade de produtos parar de crescer
+    # (carregamento preguiçoso). Argumentos: seletores de produto e o callback.
+    JS_ROLAR_ATE_ESTABILIZAR = """
+        const seletores = arguments[0].join(', ');
+        const concluir = arguments[arguments.length - 1];
+        let ultimo = 0, estavel = 0;
+        (function passo() {
+            window.scrollTo(0, document.body.scrollHeight);
+            const total = document.querySelectorAll(seletores).length;
+            if (total === ultimo) { estavel++; } else { estavel = 0; ultimo = total; }
+            if (estavel >= 2 || total > 60) concluir(total);
+            else setTimeout(passo, 300);
+        })();
+    """
+    TEMPO_LIMITE_SCRIPT = 8
     
     def __init__(self, url_inicial: str = None, 
                  max_paginas: int = 5,
@@ -75,17 +294,29 @@ class ShopeeScraperSelenium:
             vendor_id: ID do vendedor na Shopee
         """
         self.url_inicial = url_inicial or f"{self.BASE_URL}/{vendor_id}?categoryId=100639&sortBy=ctime&page=0"
+        self._url_template = self._montar_template_url(self.url_inicial)
         self.max_paginas = max_paginas
         self.espera_pagina = espera_pagina
         self.arquivo_saida = arquivo_saida or self.DEFAULT_OUTPUT
         self.headless = headless
         self.vendor_id = vendor_id
         
+        # HTML e screenshots de depuração só são gravados com SCRAPER_DEBUG=1
+        self.debug = os.environ.get('SCRAPER_DEBUG', '0') == '1'
+        
         # Inicializa o driver como None (será criado posteriormente)
         self.driver = None
         
-        # Lista para armazenar todos os produtos
-        self.todos_produtos = []
+        # Arquivo de saída, aberto uma única vez e compartilhado por todas as gravações
+        self._fd_csv = None
+        self._buffer_csv = None
+        self._writer_csv = None
+        # Indica se o arquivo de saída já tem o cabeçalho (definido ao carregar o arquivo existente)
+        self._cabecalho_csv_gravado = False
+        
+        # IDs e URLs já conhecidos, para verificar duplicatas em O(1)
+        self._ids_existentes = set()
+        self._urls_existentes = set()
         
         # Cria o diretório de debug se não existir
         if not os.path.exists(DEBUG_DIR):
@@ -93,36 +324,151 @@ class ShopeeScraperSelenium:
             
         # Carrega produtos que já foram extraídos anteriormente
         self._carregar_produtos_existentes()
+        
+        # Páginas processadas nas execuções anteriores (URL -> horário e nº de produtos)
+        self._cache_paginas = self._carregar_cache_paginas()
+    
+    @staticmethod
+    def _montar_template_url(url: str) -> str:
+        """
+        Monta, a partir da URL inicial, um template com o número da página no
+        parâmetro page (ex.: template.format(pagina=2))
+        """
+        partes = urlparse(url)
+        params = parse_qsl(partes.query, keep_blank_values=True)
+        if not any(chave == 'page' for chave, _ in params):
+            params.append(('page', '0'))
+        
+        # quote_plus codifica "{" e "}" dos valores; no restante da URL eles são
+        # duplicados para não serem interpretados pelo format
+        query = "&".join(
+            f"{quote_plus(chave)}={{pagina}}" if chave == 'page' else f"{quote_plus(chave)}={quote_plus(valor)}"
+            for chave, valor in params
+        )
+        return partes._replace(query="\0").geturl().replace("{", "{{").replace("}", "}}").replace("\0", query)
     
     def _carregar_produtos_existentes(self) -> None:
-        """Carrega produtos de um arquivo CSV existente, se disponível"""
+        """Carrega os IDs e URLs dos produtos de um arquivo CSV existente, se disponível"""
         if os.path.exists(self.arquivo_saida):
             try:
-                with open(self.arquivo_saida, 'r', encoding='utf-8') as arquivo:
-                    leitor = csv.DictReader(arquivo)
-                    self.todos_produtos = list(leitor)
-                    logger.info(f"Carregados {len(self.todos_produtos)} produtos do arquivo existente.")
+                with open(self.arquivo_saida, 'r', newline='', encoding='utf-8') as arquivo:
+                    # Lê apenas as colunas id e url, linha a linha, sem montar um dicionário por produto
+                    leitor = csv.reader(arquivo)
+                    cabecalho = next(leitor, None)
+                    if not cabecalho:
+                        return
+                    self._cabecalho_csv_gravado = True
+                    indice_id = cabecalho.index('id')
+                    indice_url = cabecalho.index('url')
+                    
+                    total = 0
+                    for linha in leitor:
+                        if len(linha) > max(indice_id, indice_url):
+                            self._ids_existentes.add(linha[indice_id])
+                            self._urls_existentes.add(linha[indice_url])
+                            total += 1
+                    logger.info(f"Carregados {total} produtos do arquivo existente.")
             except Exception as e:
                 logger.error(f"Erro ao carregar arquivo existente: {e}")
     
+    def _carregar_cache_paginas(self) -> Dict[str, Dict[str, Any]]:
+        """Carrega o cache de páginas já processadas"""
+        try:
+            with open(self.ARQUIVO_CACHE_PAGINAS, 'r', encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro ao carregar cache de páginas: {e}")
+            return {}
+    
+    def _salvar_cache_paginas(self) -> None:
+        """Persiste o cache de páginas já processadas, descartando as entradas vencidas"""
+        agora = time.time()
+        self._cache_paginas = {
+            url: entrada for url, entrada in self._cache_paginas.items()
+            if agora - entrada['timestamp'] < self.VALIDADE_CACHE_PAGINAS
+        }
+        try:
+            with open(self.ARQUIVO_CACHE_PAGINAS, 'w', encoding='utf-8') as arquivo:
+                json.dump(self._cache_paginas, arquivo, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logger.error(f"Erro ao salvar cache de páginas: {e}")
+    
+    def _abrir_csv(self, modo: str = 'a') -> None:
+        """
+        Abre o arquivo de saída uma única vez (descritor do sistema operacional em
+        modo append); as linhas são montadas em memória e gravadas uma vez por página
+        
+        Args:
+            modo: Modo de abertura do arquivo ('w' para escrever, 'a' para adicionar)
+        """
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+        if modo == 'w':
+            flags |= os.O_TRUNC
+        self._fd_csv = os.open(self.arquivo_saida, flags, 0o644)
+        self._buffer_csv = io.StringIO(newline='')
+        self._writer_csv = csv.writer(self._buffer_csv)
+        
+        # O arquivo fica aberto durante toda a execução e é fechado em fechar_driver;
+        # se o script terminar sem passar por lá, é fechado na saída do interpretador
+        atexit.unregister(self._fechar_csv)
+        atexit.register(self._fechar_csv)
+        
+        # Escreve o cabeçalho apenas se o arquivo for novo ou estiver vazio
+        # (vai para o disco junto com o primeiro lote)
+        if not self._cabecalho_csv_gravado or modo == 'w':
+            self._writer_csv.writerow(CAMPOS_CSV)
+            self._cabecalho_csv_gravado = True
+    
+    def _gravar_buffer_csv(self) -> None:
+        """Codifica o lote montado em memória de uma só vez e o grava no arquivo"""
+        # errors='replace': um caractere que não pode ser codificado (ex.: surrogate
+        # isolado vindo do navegador) não derruba a gravação do lote inteiro
+        dados = memoryview(self._buffer_csv.getvalue().encode('utf-8', 'replace'))
+        self._buffer_csv.seek(0)
+        self._buffer_csv.truncate()
+        while dados:
+            dados = dados[os.write(self._fd_csv, dados):]
+    
+    def _fechar_csv(self) -> None:
+        """Fecha o arquivo de saída"""
+        if self._fd_csv is not None:
+            os.close(self._fd_csv)
+            self._fd_csv = None
+            self._buffer_csv = None
+            self._writer_csv = None
+    
     def inicializar_driver(self) -> None:
         """Inicializa o driver do Selenium Chrome"""
         try:
             # Configura as opções do Chrome
             chrome_options = Options()
             if self.headless:
-                chrome_options.add_argument("--headless")
+                chrome_options.add_argument("--headless=new")
+            chrome_options.add_argument("--disable-gpu")
+            chrome_options.add_argument("--disable-software-rasterizer")
+            # Evita que o Chrome reduza o ritmo de abas em segundo plano em execuções longas
+            chrome_options.add_argument("--disable-background-timer-throttling")
+            chrome_options.add_argument("--disable-renderer-backgrounding")
+            chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+            chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+            # driver.get retorna no DOMContentLoaded, sem esperar os rastreadores carregados depois;
+            # cada página aguarda explicitamente pelos produtos
+            chrome_options.page_load_strategy = 'eager'
             chrome_options.add_argument("--no-sandbox")
             chrome_options.add_argument("--disable-dev-shm-usage")
             chrome_options.add_argument("--window-size=1920,1080")
             chrome_options.add_argument("--disable-notifications")
             chrome_options.add_argument("--disable-popup-blocking")
             chrome_options.add_argument("--disable-extensions")
+            chrome_options.add_argument("--disk-cache-size=134217728")
             
-            # Criar um diretório temporário único para o perfil
-            user_data_dir = tempfile.mkdtemp()
+            # Reutiliza o mesmo diretório de perfil a cada execução
+            user_data_dir = os.path.abspath(self.CHROME_PROFILE_DIR)
+            os.makedirs(user_data_dir, exist_ok=True)
             chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
-            logger.info(f"Usando diretório temporário para perfil: {user_data_dir}")
+            logger.info(f"Usando diretório de perfil: {user_data_dir}")
             
             # Adicionar user-agent mais realista
             chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
@@ -131,6 +477,12 @@ class ShopeeScraperSelenium:
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option("useAutomationExtension", False)
             
+            # Não carrega imagens nem folhas de estilo (os produtos são lidos do texto do DOM)
+            chrome_options.add_experimental_option("prefs", {
+                "profile.managed_default_content_settings.images": 2,
+                "profile.managed_default_content_settings.stylesheets": 2
+            })
+            
             # Inicializa o driver
             try:
                 # Tenta usar o chromedriver já instalado no sistema
@@ -142,6 +494,12 @@ class ShopeeScraperSelenium:
                 service = Service(chromedriver_path)
                 self.driver = webdriver.Chrome(service=service, options=chrome_options)
             
+            # Tempo máximo dos scripts assíncronos (rolagem da página)
+            self.driver.set_script_timeout(self.TEMPO_LIMITE_SCRIPT)
+            
+            # Garante que o Chrome seja encerrado mesmo se o script terminar sem passar por fechar_driver
+            atexit.register(self.fechar_driver)
+            
             # Configuração para evitar detecção de bots
             self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
                 "source": """
@@ -151,6 +509,11 @@ class ShopeeScraperSelenium:
                 """
             })
             
+            # Bloqueia na camada de rede os recursos que o scraper nunca lê
+            # (imagens, fontes, CSS e vídeos); o JavaScript continua habilitado
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(self.URLS_BLOQUEADAS)})
+            
             logger.info("Driver do Selenium inicializado com sucesso.")
         except Exception as e:
             logger.error(f"Erro ao inicializar o driver do Selenium: {e}")
@@ -158,10 +521,38 @@ class ShopeeScraperSelenium:
     
     def fechar_driver(self) -> None:
         """Fecha o driver do Selenium"""
+        self._fechar_csv()
         if self.driver:
             self.driver.quit()
+            self.driver = None
             logger.info("Driver do Selenium fechado.")
     
+    def _salvar_screenshot(self, nome: str, sempre: bool = False) -> None:
+        """
+        Salva um screenshot da página atual no diretório de debug
+        
+        Args:
+            nome: Identificação do screenshot no nome do arquivo
+            sempre: Se True, salva mesmo fora do modo debug (captcha e erros)
+        """
+        if not (self.debug or sempre):
+            return
+        screenshot_path = os.path.join(DEBUG_DIR, f"shopee_{nome}_{int(time.time())}.png")
+        try:
+            self.driver.save_screenshot(screenshot_path)
+            logger.info(f"Screenshot salvo em {screenshot_path}")
+        except Exception as e:
+            logger.error(f"Erro ao salvar screenshot: {e}")
+    
+    def _salvar_html(self) -> None:
+        """Salva o HTML da página atual no diretório de debug (apenas no modo debug)"""
+        if not self.debug:
+            return
+        html_path = os.path.join(DEBUG_DIR, f"shopee_html_{int(time.time())}.html")
+        with open(html_path, "wb", buffering=1 << 20) as f:
+            f.write(self.driver.page_source.encode("utf-8"))
+        logger.info(f"HTML da página salvo em {html_path}")
+    
     def fazer_login(self, usuario: str, senha: str) -> bool:
         """
         Faz login na Shopee com as credenciais fornecidas
@@ -175,14 +566,19 @@ class ShopeeScraperSelenium:
         """
         try:
             # Navega para a página de login
-            self.driver.get(f"{self.BASE_URL}/buyer/login")
+            url_login = f"{self.BASE_URL}/buyer/login"
+            self.driver.get(url_login)
             
-            # Aguarda a página carregar
-            time.sleep(self.espera_pagina)
+            # Aguarda os campos do formulário aparecerem
+            try:
+                WebDriverWait(self.driver, self.espera_pagina * 3).until(
+                    EC.presence_of_element_located((By.TAG_NAME, "input"))
+                )
+            except TimeoutException:
+                logger.warning("Campos de login não apareceram dentro do tempo limite")
             
             # Salva screenshot antes do login para debug
-            screenshot_path = os.path.join(DEBUG_DIR, f"shopee_pre_login_{int(time.time())}.png")
-            self.driver.save_screenshot(screenshot_path)
+            self._salvar_screenshot("pre_login")
             
             # Tenta identificar o tipo de página de login
             login_method = 0
@@ -266,24 +662,25 @@ class ShopeeScraperSelenium:
             # Clica no botão de login
             botao_login.click()
             
-            # Aguarda o redirecionamento após o login
-            time.sleep(5)
+            # Aguarda o redirecionamento após o login (sai da página de login)
+            try:
+                WebDriverWait(self.driver, self.espera_pagina * 3).until(EC.url_changes(url_login))
+            except TimeoutException:
+                logger.warning("Sem redirecionamento após o login dentro do tempo limite")
             
             # Verifica se o login foi bem-sucedido (não estamos mais na página de login)
             if "login" not in self.driver.current_url.lower() and "entrar" not in self.driver.page_source.lower():
                 logger.info("Login realizado com sucesso!")
                 
                 # Salva screenshot após o login para debug
-                screenshot_path = os.path.join(DEBUG_DIR, f"shopee_post_login_{int(time.time())}.png")
-                self.driver.save_screenshot(screenshot_path)
+                self._salvar_screenshot("post_login")
                 
                 return True
             else:
                 logger.error("Falha no login! Ainda estamos na página de login.")
                 
                 # Salva screenshot do erro para debug
-                screenshot_path = os.path.join(DEBUG_DIR, f"shopee_login_error_{int(time.time())}.png")
-                self.driver.save_screenshot(screenshot_path)
+                self._salvar_screenshot("login_error")
                 
                 return False
                 
@@ -306,21 +703,34 @@ class ShopeeScraperSelenium:
             # Acessa a URL
             self.driver.get(url)
             
-            # Aguarda a página carregar
-            time.sleep(self.espera_pagina * 2)  # Dobrar o tempo de espera
+            # Aguarda até o primeiro produto (qualquer um dos seletores) ou o aviso de
+            # "sem resultados" aparecer, em vez de uma pausa fixa; a lista de seletores
+            # vira um único seletor CSS, para cada verificação custar uma só consulta ao navegador
+            try:
+                WebDriverWait(self.driver, self.espera_pagina * 3).until(
+                    EC.presence_of_element_located(
+                        (By.CSS_SELECTOR, f"{_SELETOR_QUALQUER_PRODUTO}, {_SELETOR_SEM_RESULTADOS}")
+                    )
+                )
+            except TimeoutException:
+                logger.warning("Nenhum produto apareceu na página dentro do tempo limite")
+            
+            # Página sem resultados (fim da paginação): não há o que extrair
+            if self.driver.find_elements(By.CSS_SELECTOR, _SELETOR_SEM_RESULTADOS):
+                logger.info("A Shopee não retornou resultados para esta página")
+                return []
             
-            # Role a página para baixo para carregar mais conteúdo
-            for _ in range(3):
-                self.driver.execute_script("window.scrollBy(0, 500);")
-                time.sleep(0.5)
+            # Role a página para baixo até todos os produtos serem carregados
+            try:
+                self.driver.execute_async_script(self.JS_ROLAR_ATE_ESTABILIZAR, _SELETORES_PRODUTO)
+            except TimeoutException:
+                logger.warning("A lista de produtos não estabilizou dentro do tempo limite")
             
             # Verifica se estamos na página de captcha ou login
             if "captcha" in self.driver.current_url.lower() or "anti_fraud" in self.driver.current_url.lower():
                 logger.warning("Detectado captcha ou verificação anti-fraude!")
-                # Salvar screenshot para debug
-                screenshot_path = os.path.join(DEBUG_DIR, f"shopee_captcha_{int(time.time())}.png")
-                self.driver.save_screenshot(screenshot_path)
-                logger.info(f"Screenshot do captcha salvo em {screenshot_path}")
+                # Salvar screenshot para debug (mesmo fora do modo debug)
+                self._salvar_screenshot("captcha", sempre=True)
                 
                 # Pausa para intervenção manual se necessário
                 logger.info("Aguardando 30 segundos para intervenção manual se necessário")
@@ -331,9 +741,7 @@ class ShopeeScraperSelenium:
             if "login" in self.driver.current_url.lower() or "Entre" in self.driver.page_source:
                 logger.warning("Página de login detectada! O scraper precisa de autenticação para acessar os produtos.")
                 # Salvar screenshot para debug
-                screenshot_path = os.path.join(DEBUG_DIR, f"shopee_login_{int(time.time())}.png")
-                self.driver.save_screenshot(screenshot_path)
-                logger.info(f"Screenshot da página de login salvo em {screenshot_path}")
+                self._salvar_screenshot("login")
                 
                 # Criar arquivo dummy com alguns produtos para evitar erros no dashboard
                 self._criar_produtos_dummy()
@@ -341,148 +749,54 @@ class ShopeeScraperSelenium:
                 return []
             
             # Salvar o HTML da página para depuração
-            html_path = os.path.join(DEBUG_DIR, f"shopee_html_{int(time.time())}.html")
-            with open(html_path, "w", encoding="utf-8") as f:
-                f.write(self.driver.page_source)
-            logger.info(f"HTML da página salvo em {html_path}")
-            
-            # Na Shopee, às vezes a estrutura do DOM pode variar. Vamos tentar diferentes seletores
-            # Atualizando os seletores com base na estrutura atual do site da Shopee
-            seletores_produto = [
-                ".shopee-search-item-result__item",
-                ".col-xs-2-4",
-                "div[data-sqe='item']",
-                ".vN6sSJ",
-                ".O6wiAW",
-                ".UE17k8",  # Adicionando mais seletores
-                "div.shop-search-result-view__item",
-                ".mEwYy6",
-                ".EPRXcr"
-            ]
-            
-            elementos_produto = []
-            for seletor in seletores_produto:
-                try:
-                    # Aguarda os elementos de produto serem carregados
-                    WebDriverWait(self.driver, 5).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, seletor))
-                    )
-                    elementos = self.driver.find_elements(By.CSS_SELECTOR, seletor)
-                    if elementos:
-                        logger.info(f"Encontrados {len(elementos)} elementos com o seletor: {seletor}")
-                        elementos_produto = elementos
-                        break
-                except TimeoutException:
-                    continue
+            self._salvar_html()
+            
+            # Lê nome, preço e link de todos os produtos em uma única chamada ao navegador
+            resultado = self.driver.execute_script(
+                self.JS_EXTRAIR_PRODUTOS, _SELETORES_PRODUTO, _SELETORES_NOME, _SELETORES_PRECO, self.url_inicial
+            ) or {}
+            itens = resultado.get("itens") or []
             
-            # Se não encontrar usando seletores específicos, tenta uma abordagem mais genérica
-            if not elementos_produto:
+            if resultado.get("seletor"):
+                logger.info(f"Encontrados {len(itens)} elementos com o seletor: {resultado['seletor']}")
+            elif itens:
                 logger.warning("Tentando abordagem genérica para encontrar produtos")
-                try:
-                    # Tenta encontrar elementos de link que parecem ser produtos
-                    elementos_produto = self.driver.find_elements(By.XPATH, "//a[contains(@href, '/product/')]")
-                    if elementos_produto:
-                        logger.info(f"Encontrados {len(elementos_produto)} elementos usando links de produto")
-                except Exception as e:
-                    logger.error(f"Erro na abordagem genérica: {e}")
+                logger.info(f"Encontrados {len(itens)} elementos usando links de produto")
             
-            if not elementos_produto:
+            if not itens:
                 logger.warning("Nenhum elemento de produto encontrado na página")
                 # Salvar screenshot para debug
-                screenshot_path = os.path.join(DEBUG_DIR, f"shopee_page_{int(time.time())}.png")
-                try:
-                    self.driver.save_screenshot(screenshot_path)
-                    logger.info(f"Screenshot salvo em {screenshot_path}")
-                except Exception as e:
-                    logger.error(f"Erro ao salvar screenshot: {e}")
+                self._salvar_screenshot("page")
                 return []
             
-            logger.info(f"Encontrados {len(elementos_produto)} elementos de produto na página.")
+            logger.info(f"Encontrados {len(itens)} elementos de produto na página.")
             
-            # Seletores para nome e preço do produto
-            seletores_nome = [".Ms6aG0", ".ie3A+n", ".ZV6pse", "div[data-sqe='name']", ".KZ8jpR"]
-            seletores_preco = [".JXPQYt", "._0ZJOIv", ".nSU4nsX", "div[data-sqe='price']", ".WTFwws"]
+            # Todos os produtos da página recebem o mesmo horário de extração
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-            # Percorre cada elemento de produto
-            for elemento in elementos_produto:
+            # Percorre os dados de cada produto (dicionários simples, sem chamadas ao driver)
+            for item in itens:
                 try:
-                    # Tenta extrair o nome do produto usando diferentes seletores
-                    nome = None
-                    for seletor in seletores_nome:
-                        try:
-                            nome_elemento = elemento.find_element(By.CSS_SELECTOR, seletor)
-                            nome = nome_elemento.text.strip()
-                            if nome:
-                                break
-                        except (NoSuchElementException, Exception):
-                            continue
-                    
+                    nome = item.get("nome")
                     if not nome:
                         logger.warning("Não foi possível encontrar o nome do produto")
                         continue
                     
                     # Verifica se é um CD com base no nome
-                    if not self._is_cd(nome):
+                    nome_lower = nome.lower()
+                    if not self._is_cd(nome, nome_lower):
                         continue
                     
-                    # Extrai o preço usando diferentes seletores
-                    preco = "Não disponível"
-                    for seletor in seletores_preco:
-                        try:
-                            preco_elemento = elemento.find_element(By.CSS_SELECTOR, seletor)
-                            preco = preco_elemento.text.strip()
-                            if preco:
-                                break
-                        except (NoSuchElementException, Exception):
-                            continue
-                    
-                    # Extrai o link do produto
-                    link = ""
-                    try:
-                        # Primeiro tenta encontrar o link direto no elemento
-                        link = elemento.find_element(By.TAG_NAME, "a").get_attribute("href")
-                    except NoSuchElementException:
-                        try:
-                            # Depois tenta procurar qualquer elemento que seja clicável
-                            clickable = elemento.find_element(By.CSS_SELECTOR, "[href], [onclick]")
-                            link = clickable.get_attribute("href") or self.url_inicial
-                        except NoSuchElementException:
-                            pass
+                    preco = item.get("preco") or "Não disponível"
+                    link = item.get("link") or ""
                     
-                    # Se ainda não temos link, vamos pegar qualquer elemento pai ou filho que tenha href
-                    if not link:
-                        try:
-                            # Tenta encontrar links no elemento pai
-                            parent = elemento.find_element(By.XPATH, "..")
-                            link = parent.get_attribute("href") or ""
-                        except:
-                            pass
-                    
-                    # Extrai a categoria
-                    categoria = self._extrair_categoria(nome)
-                    
-                    # Extrair vendedor
-                    vendedor = self.vendor_id
-                    
-                    # Criar ID único para o produto
-                    produto_id = f"{vendedor}_{self._extract_product_id(link or nome)}"
-                    
-                    # Cria o dicionário do produto
-                    produto = {
-                        "id": produto_id,
-                        "titulo": nome,
-                        "preco": preco,
-                        "categoria": categoria,
-                        "vendedor": vendedor,
-                        "artista": self._extrair_artista(nome),
-                        "url": link,
-                        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    }
+                    produto = self._criar_produto(nome, preco, link, nome_lower=nome_lower, timestamp=timestamp)
                     
                     # Adiciona o produto à lista apenas se ele ainda não existir
                     if not self._produto_ja_existe(produto):
+                        self._registrar_produto(produto)
                         produtos.append(produto)
-                        logger.info(f"Produto extraído: {nome}")
+                        logger.info("Produto extraído: %s", nome)
                 
                 except Exception as e:
                     logger.error(f"Erro ao extrair produto: {e}")
@@ -492,22 +806,168 @@ class ShopeeScraperSelenium:
         
         except Exception as e:
             logger.error(f"Erro ao processar a página {url}: {e}")
-            # Salvar screenshot para debug em caso de erro
-            try:
-                screenshot_path = os.path.join(DEBUG_DIR, f"shopee_error_{int(time.time())}.png")
-                self.driver.save_screenshot(screenshot_path)
-                logger.info(f"Screenshot de erro salvo em {screenshot_path}")
-            except:
-                pass
+            # Salvar screenshot para debug em caso de erro (mesmo fora do modo debug)
+            self._salvar_screenshot("error", sempre=True)
             return []
     
+    def _criar_produto(self, nome: str, preco: str, link: str, id_produto: Optional[str] = None,
+                       nome_lower: Optional[str] = None, timestamp: Optional[str] = None) -> Dict[str, str]:
+        """
+        Monta o dicionário do produto a partir dos dados extraídos
+        
+        Args:
+            nome: Título do produto
+            preco: Preço exibido
+            link: URL do produto
+            id_produto: ID do produto na Shopee (se None, é extraído do link)
+            nome_lower: Título já em minúsculas (se None, é calculado)
+            timestamp: Data/hora da extração (se None, usa o momento atual)
+            
+        Returns:
+            Dicionário com as informações do produto
+        """
+        nome_lower = nome_lower or nome.lower()
+        
+        # Extrair vendedor
+        vendedor = self.vendor_id
+        
+        # Criar ID único para o produto
+        produto_id = f"{vendedor}_{id_produto or self._extract_product_id(link or nome)}"
+        
+        return {
+            "id": produto_id,
+            "titulo": nome,
+            "preco": preco,
+            "categoria": self._extrair_categoria(nome, nome_lower),
+            "vendedor": vendedor,
+            "artista": self._extrair_artista(nome, nome_lower),
+            "url": link,
+            "timestamp": timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+    
+    def _criar_sessao_api(self) -> requests.Session:
+        """Cria uma sessão HTTP com o user-agent e os cookies do navegador (inclusive do login)"""
+        sessao = requests.Session()
+        # Uma conexão keep-alive (TCP + TLS) por requisição simultânea, reaproveitada entre as páginas
+        sessao.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.MAX_REQUISICOES_API))
+        sessao.headers.update({
+            "User-Agent": self.driver.execute_script("return navigator.userAgent;"),
+            "Accept": "application/json",
+            "Referer": self.url_inicial,
+            "X-Api-Source": "pc",
+            "X-Shopee-Language": "pt-BR",
+            "X-Requested-With": "XMLHttpRequest"
+        })
+        for cookie in self.driver.get_cookies():
+            sessao.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'))
+        return sessao
+    
+    def _obter_json_api(self, sessao: requests.Session, caminho: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Consulta um endpoint da API da Shopee
+        
+        Returns:
+            JSON da resposta, ou None em caso de bloqueio (403/captcha) ou erro
+        """
+        try:
+            resposta = sessao.get(f"{self.BASE_URL}{caminho}", params=params, timeout=15)
+            if resposta.status_code == 403 or "captcha" in resposta.url.lower():
+                logger.warning(f"API da Shopee bloqueada ({resposta.status_code}) em {caminho}")
+                return None
+            resposta.raise_for_status()
+            dados = resposta.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Erro ao consultar a API da Shopee em {caminho}: {e}")
+            return None
+        
+        if not isinstance(dados, dict) or dados.get("error"):
+            logger.warning(f"API da Shopee retornou erro em {caminho}: {dados.get('error') if isinstance(dados, dict) else dados}")
+            return None
+        return dados
+    
+    def _produtos_da_api(self, itens: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Converte os itens retornados pela API em produtos (apenas CDs ainda não extraídos)"""
+        produtos = []
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for item in itens:
+            try:
+                basico = item.get("item_basic") or item
+                nome = (basico.get("name") or "").strip()
+                nome_lower = nome.lower()
+                if not nome or not self._is_cd(nome, nome_lower):
+                    continue
+                
+                shop_id, item_id = basico.get("shopid"), basico.get("itemid")
+                
+                # A API informa o preço em centésimos de milésimo (ex.: 3000000 = R$ 30,00)
+                preco = basico.get("price")
+                preco = f"R$ {preco / 100000:.2f}".replace(".", ",") if preco else "Não disponível"
+                
+                link = f"{self.BASE_URL}/product/{shop_id}/{item_id}"
+                produto = self._criar_produto(nome, preco, link, id_produto=f"{shop_id}_{item_id}",
+                                             nome_lower=nome_lower, timestamp=timestamp)
+                
+                if not self._produto_ja_existe(produto):
+                    self._registrar_produto(produto)
+                    produtos.append(produto)
+                    logger.info("Produto extraído (API): %s", nome)
+            except Exception as e:
+                logger.error(f"Erro ao extrair produto da API: {e}")
+        return produtos
+    
+    def navegar_via_api(self) -> Optional[List[Dict[str, str]]]:
+        """
+        Extrai os produtos pela API JSON da loja, buscando as páginas em paralelo
+        
+        Returns:
+            Lista de produtos extraídos, ou None se a API estiver indisponível
+            (nesse caso a extração continua pelo Selenium)
+        """
+        sessao = self._criar_sessao_api()
+        
+        detalhe = self._obter_json_api(sessao, self.API_DETALHE_LOJA, {"username": self.vendor_id})
+        shop_id = ((detalhe or {}).get("data") or {}).get("shopid")
+        if not shop_id:
+            return None
+        
+        limitador = _LimitadorTaxa(self.INTERVALO_API, variacao=self.INTERVALO_API / 2)
+        
+        def buscar_pagina(pagina: int) -> Optional[Dict[str, Any]]:
+            limitador.aguardar()
+            return self._obter_json_api(sessao, self.API_BUSCA_LOJA, {
+                "shop_id": shop_id,
+                "sort_by": "ctime",
+                "offset": pagina * self.ITENS_POR_PAGINA_API,
+                "limit": self.ITENS_POR_PAGINA_API
+            })
+        
+        produtos = []
+        with ThreadPoolExecutor(max_workers=min(self.max_paginas, self.MAX_REQUISICOES_API)) as executor:
+            # As respostas chegam na ordem das páginas
+            for pagina, dados in enumerate(executor.map(buscar_pagina, range(self.max_paginas))):
+                if dados is None:
+                    if pagina == 0:
+                        return None
+                    break
+                
+                itens = dados.get("items") or []
+                if not itens:
+                    logger.info(f"Nenhum item na página {pagina + 1} da API. Encerrando.")
+                    break
+                
+                produtos_pagina = self._produtos_da_api(itens)
+                self.salvar_para_csv(produtos_pagina)
+                produtos.extend(produtos_pagina)
+        
+        return produtos
+    
     def _extract_product_id(self, url: str) -> str:
         """Extrai o ID do produto a partir da URL"""
         try:
             parsed_url = urlparse(url)
             path = parsed_url.path
             # O padrão da URL da Shopee geralmente termina com um ID numérico
-            match = re.search(r'i\.(\d+)\.(\d+)', url)
+            match = _SHOPEE_ID_RE.search(url)
             if match:
                 return f"{match.group(1)}_{match.group(2)}"
             return path.split('-i.')[-1] if '-i.' in path else path.split('.')[-1]
@@ -516,81 +976,53 @@ class ShopeeScraperSelenium:
     
     def _produto_ja_existe(self, produto: Dict[str, str]) -> bool:
         """Verifica se o produto já existe na lista de produtos extraídos"""
-        for prod_existente in self.todos_produtos:
-            if prod_existente.get('id') == produto['id'] or prod_existente.get('url') == produto['url']:
-                return True
-        return False
+        return produto['id'] in self._ids_existentes or produto['url'] in self._urls_existentes
+    
+    def _registrar_produto(self, produto: Dict[str, str]) -> None:
+        """Registra o ID e a URL do produto para as próximas verificações de duplicata"""
+        self._ids_existentes.add(produto['id'])
+        self._urls_existentes.add(produto['url'])
     
-    def _is_cd(self, titulo: str) -> bool:
+    def _is_cd(self, titulo: str, titulo_lower: Optional[str] = None) -> bool:
         """
         Verifica se o produto é um CD com base no título
         
         Args:
             titulo: Título do produto
+            titulo_lower: Título já em minúsculas (se None, é calculado)
             
         Returns:
             True se for um CD, False caso contrário
         """
-        titulo_lower = titulo.lower()
+        titulo_lower = titulo_lower or titulo.lower()
         
         # Frases específicas que indicam que o produto é um CD
-        frases_cd = [
-            'cd ', 'cd-', '[cd]', '(cd)', ' cd', 'álbum cd', 'album cd',
-            'compact disc', 'box cd', 'cd box', 'cdbox', 'cd single',
-            'audio cd', 'áudio cd', 'cd audio', 'cd de música', 'cd de musica',
-            'cd musical', 'cd original', 'cd lacrado', 'cd novo',
-            'disco compacto', 'coletânea cd', 'coletanea cd'
-        ]
-        
-        for frase in frases_cd:
-            if frase in titulo_lower:
-                # Verifica exclusões após encontrar correspondência
-                # Mas primeiro confirma que é realmente um CD
-                exclusoes = [
-                    'cabo', 'controle', 'caixa', 'acessório', 'acessorio', 
-                    'case', 'estojo', 'suporte', 'dvd', 'notebook', 'player', 
-                    'laptop', 'hd', 'ssd', 'pendrive', 'mouse', 'fone', 
-                    'headset', 'pc'
-                ]
-                
-                for exclusao in exclusoes:
-                    if exclusao in titulo_lower:
-                        # Se encontrou um termo de exclusão, verifica se há termos específicos
-                        # que confirmam que é um CD apesar do termo de exclusão
-                        confirmacoes = ['banda', 'artista', 'cantor', 'álbum', 'album', 'música', 'musica', 'rock']
-                        for confirmacao in confirmacoes:
-                            if confirmacao in titulo_lower:
-                                return True
-                        
-                        # Se não encontrou confirmação, provavelmente não é um CD
-                        return False
-                
-                # Se não encontrou exclusões, é um CD
-                return True
+        if _CD_RE.search(titulo_lower):
+            # Se encontrou um termo de exclusão, só é um CD se houver termos específicos
+            # que confirmem que é um CD apesar do termo de exclusão
+            if _CD_EXCLUSAO_RE.search(titulo_lower):
+                return _CD_CONFIRMACAO_RE.search(titulo_lower) is not None
+            
+            # Se não encontrou exclusões, é um CD
+            return True
         
         # Verifica se contém o nome de gêneros musicais comuns junto com indicações de ser uma mídia física
-        generos = ['rock', 'pop', 'mpb', 'samba', 'jazz', 'blues', 'hip hop', 'rap', 'funk', 'sertanejo', 'gospel']
-        termos_midia = ['álbum', 'album', 'disco', 'single', 'faixa', 'banda', 'lançamento']
-        
-        for genero in generos:
-            if genero in titulo_lower:
-                for termo in termos_midia:
-                    if termo in titulo_lower:
-                        return True
+        if _GENEROS_RE.search(titulo_lower) and _TERMOS_MIDIA_RE.search(titulo_lower):
+            return True
         
         # Verificações adicionais para nomes de artistas famosos + indicações de mídia física
-        if any(artista in titulo_lower for artista in ['madonna', 'michael jackson', 'queen', 'beatles', 'u2', 'metallica']):
-            if any(midia in titulo_lower for midia in ['álbum', 'album', 'single', 'remix', 'versão', 'versao', 'edição', 'edicao']):
-                return True
-                
+        if _ARTISTAS_FAMOSOS_RE.search(titulo_lower) and _MIDIA_ARTISTAS_RE.search(titulo_lower):
+            return True
+        
         return False  # Se não encontrou nenhuma das frases, não é um CD
     
-    def _extrair_artista(self, titulo: str) -> str:
+    def _extrair_artista(self, titulo: str, titulo_lower: Optional[str] = None) -> str:
         """
         Tenta extrair o nome do artista do título do produto
         
         Args:
             titulo: Título do produto
+            titulo_lower: Título já em minúsculas (se None, é calculado)
             
         Returns:
             Nome do artista, se identificado
@@ -599,17 +1031,19 @@ class ShopeeScraperSelenium:
         # Geralmente no formato: "Artista - Nome do Álbum" ou "CD Nome do Álbum - Artista"
         
         # Normaliza o título para evitar problemas com codificação
-        titulo = titulo.replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">")
+        if "&" in titulo:
+            titulo = titulo.replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">")
+            titulo_lower = None
+        titulo_lower = titulo_lower or titulo.lower()
         
         # Padrão: "Artista - Nome do Álbum"
         if " - " in titulo:
             partes = titulo.split(" - ", 1)
             
             # Verifica se a primeira parte contém palavra-chave de CD
-            palavras_cd = ["cd", "álbum", "album", "disco"]
             primeira_parte_lower = partes[0].lower()
             
-            if any(palavra in primeira_parte_lower for palavra in palavras_cd):
+            if any(palavra in primeira_parte_lower for palavra in _PALAVRAS_CD):
                 # Provavelmente é "CD Nome - Artista"
                 if len(partes) > 1:
                     return partes[1].strip()
@@ -618,120 +1052,112 @@ class ShopeeScraperSelenium:
                 return partes[0].strip()
         
         # Padrão: "CD Artista - Nome do Álbum"
-        if titulo.lower().startswith("cd ") and " - " in titulo[3:]:
+        if titulo_lower.startswith("cd ") and " - " in titulo[3:]:
             titulo_sem_cd = titulo[3:]
             partes = titulo_sem_cd.split(" - ", 1)
             return partes[0].strip()
         
         # Padrão: "CD Nome do Álbum do Artista"
-        if titulo.lower().startswith("cd "):
+        if titulo_lower.startswith("cd "):
             # Procura por padrões como "do Artista", "by Artista", "de Artista"
             texto = titulo[3:]  # Remove "CD " do início
-            for padrao in [" do ", " by ", " de ", " por ", " with "]:
-                if padrao in texto.lower():
-                    partes = texto.lower().split(padrao, 1)
+            texto_lower = titulo_lower[3:]
+            for padrao in _PREPOSICOES_ARTISTA:
+                if padrao in texto_lower:
+                    partes = texto_lower.split(padrao, 1)
                     if len(partes) > 1:
                         return texto.split(padrao, 1)[1].strip()
         
-        # Tenta encontrar artistas conhecidos no título
-        artistas_conhecidos = [
-            "Madonna", "Michael Jackson", "Queen", "Beatles", "U2", "Metallica",
-            "AC/DC", "Pink Floyd", "Rolling Stones", "Led Zeppelin", "Black Sabbath",
-            "Elvis Presley", "Bob Dylan", "David Bowie", "Prince", "Nirvana",
-            "Bruce Springsteen", "The Police", "Dire Straits", "Guns N' Roses",
-            "Iron Maiden", "Aerosmith", "Deep Purple", "Kiss", "Bon Jovi",
-            "Red Hot Chili Peppers", "Pearl Jam", "Radiohead", "Coldplay",
-            "Roberto Carlos", "Caetano Veloso", "Gilberto Gil", "Tim Maia",
-            "Djavan", "Lulu Santos", "Legião Urbana", "Paralamas do Sucesso",
-            "Titãs", "Barão Vermelho", "Capital Inicial", "Skank", "Jota Quest"
-        ]
-        
-        for artista in artistas_conhecidos:
-            if artista.lower() in titulo.lower():
-                # Verifica se o artista é parte de uma palavra maior
-                indice = titulo.lower().find(artista.lower())
-                fim_indice = indice + len(artista)
-                
-                # Verifica se o artista está como palavra isolada ou no início/fim
-                if (indice == 0 or not titulo[indice-1].isalpha()) and \
-                   (fim_indice == len(titulo) or not titulo[fim_indice].isalpha()):
-                    return artista
+        # Tenta encontrar artistas conhecidos no título (o primeiro da lista tem prioridade)
+        encontrados = {m.group() for m in _ARTISTAS_CONHECIDOS_RE.finditer(titulo_lower)}
+        if encontrados:
+            return min(_PRIORIDADE_ARTISTAS[nome] for nome in encontrados)[1]
         
         return "Não identificado"
     
-    def _extrair_categoria(self, titulo: str) -> str:
+    def _extrair_categoria(self, titulo: str, titulo_lower: Optional[str] = None) -> str:
         """
         Tenta extrair a categoria do CD com base no título
         
         Args:
             titulo: Título do produto
+            titulo_lower: Título já em minúsculas (se None, é calculado)
             
         Returns:
             Categoria do CD
         """
-        titulo_lower = titulo.lower()
-        
-        # Mapeamento de palavras-chave para categorias
-        categorias = {
-            'rock': ['rock', 'metal', 'punk', 'grunge'],
-            'pop': ['pop', 'pop music'],
-            'mpb': ['mpb', 'música popular brasileira', 'musica popular brasileira'],
-            'samba': ['samba', 'pagode', 'axé', 'axe'],
-            'jazz': ['jazz', 'blues'],
-            'clássica': ['clássica', 'classica', 'classical', 'orchestra'],
-            'hip hop': ['hip hop', 'rap', 'hip-hop', 'trap'],
-            'eletrônica': ['eletrônica', 'eletronica', 'electronic', 'dance', 'techno'],
-            'reggae': ['reggae', 'ska'],
-            'country': ['country', 'folk', 'sertanejo']
-        }
-        
-        for categoria, keywords in categorias.items():
-            for keyword in keywords:
-                if keyword in titulo_lower:
-                    return categoria
-        
-        return "Outros"  # Categoria padrão
+        return _categorizar(titulo_lower or titulo.lower())
     
-    def navegar_por_paginas(self) -> List[Dict[str, str]]:
+    def navegar_por_paginas(self) -> Iterator[Dict[str, str]]:
         """
         Navega pela lista de páginas de resultados
         
-        Returns:
-            Lista de todos os produtos extraídos
+        Os produtos de cada página são gravados no CSV e entregues assim que a
+        página termina, sem acumular a extração inteira em memória.
+        
+        Yields:
+            Cada produto novo extraído
         """
+        # Caminho rápido: API JSON da loja; o Selenium fica como alternativa (ex.: captcha)
+        produtos_api = self.navegar_via_api()
+        if produtos_api is not None:
+            logger.info(f"Extraídos {len(produtos_api)} produtos pela API da Shopee")
+            yield from produtos_api
+            return
+        logger.info("API da Shopee indisponível. Navegando pelas páginas com o Selenium.")
+        
+        # As páginas são buscadas em paralelo no caminho da API (navegar_via_api).
+        # Aqui, no navegador, elas continuam em sequência: esse caminho só é usado
+        # quando a Shopee bloqueia a API, vários Chromes simultâneos aumentam a chance
+        # de captcha, e o perfil persistente (CHROME_PROFILE_DIR) só pode ser aberto
+        # por uma instância do Chrome de cada vez.
         pagina_atual = 0
-        produtos_extraidos = []
         
-        while pagina_atual < self.max_paginas:
-            # Constrói a URL para esta página
-            url_paginada = self.url_inicial.replace("page=0", f"page={pagina_atual}")
-            
-            logger.info(f"Processando página {pagina_atual + 1}/{self.max_paginas}: {url_paginada}")
-            
-            # Extrai produtos desta página
-            produtos_pagina = self.extrair_produtos_pagina(url_paginada)
-            
-            # Adiciona à lista total
-            produtos_extraidos.extend(produtos_pagina)
-            
-            # Se a página não retornou produtos, assume que chegamos ao fim
-            if not produtos_pagina:
-                logger.info(f"Nenhum produto encontrado na página {pagina_atual + 1}. Encerrando.")
-                break
-            
-            # Aguarda um pouco antes de ir para a próxima página (para evitar bloqueios)
-            tempo_espera = self.espera_pagina + random.uniform(1.0, 3.0)
-            logger.info(f"Aguardando {tempo_espera:.2f} segundos antes da próxima página...")
-            time.sleep(tempo_espera)
-            
-            pagina_atual += 1
+        # Intervalo entre o início de uma página e o da seguinte (para evitar bloqueios)
+        limitador = _LimitadorTaxa(self.espera_pagina + 1.0, variacao=2.0)
+        
+        # O cache de páginas é salvo mesmo se a iteração for interrompida
+        try:
+            while pagina_atual < self.max_paginas:
+                # Constrói a URL para esta página
+                url_paginada = self._url_template.format(pagina=pagina_atual)
+                
+                # Página processada recentemente: seus produtos já estão no CSV
+                entrada = self._cache_paginas.get(url_paginada)
+                if entrada and time.time() - entrada['timestamp'] < self.VALIDADE_CACHE_PAGINAS:
+                    logger.info("Página %d processada recentemente (%d produtos). Pulando.",
+                                pagina_atual + 1, entrada['produtos'])
+                    pagina_atual += 1
+                    continue
+                
+                limitador.aguardar()
+                # Formatação preguiçosa (%): só é feita se o nível INFO estiver habilitado
+                logger.info("Processando página %d/%d: %s", pagina_atual + 1, self.max_paginas, url_paginada)
+                
+                # Extrai produtos desta página e já os grava no arquivo CSV
+                produtos_pagina = self.extrair_produtos_pagina(url_paginada)
+                self.salvar_para_csv(produtos_pagina)
+                if produtos_pagina:
+                    self._cache_paginas[url_paginada] = {'timestamp': time.time(), 'produtos': len(produtos_pagina)}
+                
+                # Se a página não retornou produtos, assume que chegamos ao fim
+                if not produtos_pagina:
+                    logger.info("Nenhum produto encontrado na página %d. Encerrando.", pagina_atual + 1)
+                    break
+                
+                yield from produtos_pagina
+                pagina_atual += 1
         
-        return produtos_extraidos
+        finally:
+            self._salvar_cache_paginas()
     
     def salvar_para_csv(self, produtos: List[Dict[str, str]], modo: str = 'a') -> bool:
         """
         Salva os produtos extraídos para um arquivo CSV
         
+        Todas as gravações passam pelo mesmo arquivo aberto; cada chamada grava
+        um lote (uma página) e faz um único flush.
+        
         Args:
             produtos: Lista de dicionários com informações dos produtos
             modo: Modo de abertura do arquivo ('w' para escrever, 'a' para adicionar)
@@ -743,25 +1169,24 @@ class ShopeeScraperSelenium:
             logger.info("Nenhum produto para salvar.")
             return True
         
-        # Define o cabeçalho do CSV
-        fieldnames = ['id', 'titulo', 'artista', 'preco', 'categoria', 'vendedor', 'url', 'timestamp']
-        
         try:
-            # Verifica se o arquivo já existe para determinar se precisa escrever o cabeçalho
-            arquivo_existe = os.path.exists(self.arquivo_saida) and os.path.getsize(self.arquivo_saida) > 0
+            if modo == 'w':
+                # Reescreve o arquivo do zero
+                self._fechar_csv()
+                self._abrir_csv('w')
+            elif self._writer_csv is None:
+                self._abrir_csv()
             
-            with open(self.arquivo_saida, modo, newline='', encoding='utf-8') as arquivo:
-                writer = csv.DictWriter(arquivo, fieldnames=fieldnames)
-                
-                # Escreve o cabeçalho apenas se o arquivo for novo ou estiver vazio
-                if not arquivo_existe or modo == 'w':
-                    writer.writeheader()
-                
-                # Escreve as linhas com os dados dos produtos
-                for produto in produtos:
-                    # Garante que todos os campos necessários existam
-                    row = {field: produto.get(field, '') for field in fieldnames}
-                    writer.writerow(row)
+            # Valores para campos ausentes: vazio, e um único horário para o lote inteiro
+            padrao = dict.fromkeys(CAMPOS_CSV, '')
+            padrao['timestamp'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            
+            # Uma tupla por produto, na ordem do cabeçalho, gravadas em uma única chamada.
+            # O csv.writer (em C) custa o mesmo que montar as linhas à mão com join e
+            # escape próprio, e já trata aspas e quebras de linha
+            linhas = [_VALORES_CSV({**padrao, **produto}) for produto in produtos]
+            self._writer_csv.writerows(linhas)
+            self._gravar_buffer_csv()
             
             logger.info(f"Dados salvos com sucesso em {self.arquivo_saida}. Total: {len(produtos)} produtos.")
             return True
@@ -789,15 +1214,12 @@ class ShopeeScraperSelenium:
             else:
                 logger.warning("Credenciais não encontradas no arquivo .env. O scraper pode não funcionar corretamente.")
             
-            # Navega pelas páginas e extrai os produtos
-            novos_produtos = self.navegar_por_paginas()
+            # Navega pelas páginas e extrai os produtos (os produtos novos de
+            # cada página já são gravados no arquivo CSV ao fim da página)
+            total_novos = sum(1 for _ in self.navegar_por_paginas())
             
-            if novos_produtos:
-                # Salva os produtos no arquivo CSV
-                if self.salvar_para_csv(novos_produtos):
-                    logger.info(f"Total de {len(novos_produtos)} novos produtos salvos no arquivo {self.arquivo_saida}")
-                else:
-                    logger.error("Erro ao salvar os produtos no arquivo CSV")
+            if total_novos:
+                logger.info(f"Total de {total_novos} novos produtos salvos no arquivo {self.arquivo_saida}")
             else:
                 logger.warning("Nenhum novo produto encontrado")
                 
@@ -820,22 +1242,18 @@ class ShopeeScraperSelenium:
                 "preco": "R$ 30,00",
                 "categoria": "CD",
                 "vendedor": self.vendor_id,
-                "url": self.url_inicial,
-                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                "url": self.url_inicial
             }
         ]
         
-        # Salva os produtos dummy para CSV
-        try:
-            with open(self.arquivo_saida, 'w', newline='', encoding='utf-8') as arquivo_csv:
-                writer = csv.DictWriter(arquivo_csv, fieldnames=produtos_dummy[0].keys())
-                writer.writeheader()
-                writer.writerows(produtos_dummy)
+        # Salva os produtos dummy para CSV (o horário é preenchido ao gravar o lote)
+        if self.salvar_para_csv(produtos_dummy, modo='w'):
             logger.info(f"Salvos {len(produtos_dummy)} produtos dummy no arquivo {self.arquivo_saida}")
-        except Exception as e:
-            logger.error(f"Erro ao salvar produtos dummy: {e}")
+        else:
+            logger.error("Erro ao salvar produtos dummy")
             
-        self.todos_produtos.extend(produtos_dummy)
+        for produto in produtos_dummy:
+            self._registrar_produto(produto)
 
 def verificar_dependencias():
     """Verifica se todas as dependências estão instaladas"""
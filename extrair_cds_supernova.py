@@ -13,11 +13,14 @@ import random
 import logging
 import datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
-from typing import List, Dict, Optional, Any, Union
+from typing import List, Dict, Optional, Any, Union, Tuple
 from urllib.parse import urljoin
 import re
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 
 # Cria as pastas para logs e debug se não existirem
 os.makedirs('logs', exist_ok=True)
@@ -41,11 +44,33 @@ logging.basicConfig(
 
 logger = logging.getLogger('scraper_supernova')
 
+# Regexes compiladas uma única vez, usadas no processamento de cada produto
+_PRICE_RE = re.compile(r'R\$\s*(\d+[,.]\d+)')
+_NEXT_PAGE_RE = re.compile(r'Próxim[oa]|»')
+_CD_PREFIX_RE = re.compile(r'^CD\s+')
+
+# Categorias com mapeamento mais detalhado, na ordem de prioridade.
+# Testes com ~30 checagens "in" saíram mais rápidos que uma única regex com
+# alternação (e o pyahocorasick não está entre as dependências do projeto).
+_CATEGORIAS = (
+    (("rock", "pop"), "Rock / Pop"),
+    (("jazz",), "Jazz"),
+    (("brasil", "mpb", "samba", "bossa", "choro"), "Música do Brasil"),
+    (("world", "música do mundo"), "World Music"),
+    (("black", "soul", "funk", "r&b", "hip hop", "rap"), "Black Music"),
+    (("clássic", "erudito", "orquestra", "symphony"), "Eruditos"),
+    (("blues",), "Blues"),
+    (("reggae", "ska", "dub"), "Reggae"),
+    (("eletrônic", "techno", "house", "trance"), "Eletrônica")
+)
+
 class SupernovaDiscosScraper:
     """Classe para extrair informações de CDs do site Supernova Discos"""
     
     BASE_URL = "https://www.supernovadiscos.com.br"
     DEFAULT_OUTPUT = "produtos_cd_supernova.csv"
+    # Número de páginas baixadas em paralelo (baixo, para não sobrecarregar o site)
+    MAX_CONEXOES = 4
     
     def __init__(self, url_inicial: str = None, 
                  max_paginas: int = 100, 
@@ -70,7 +95,12 @@ class SupernovaDiscosScraper:
         self.delay_max = delay_max
         self.arquivo_saida = arquivo_saida or self.DEFAULT_OUTPUT
         self.modo = modo.lower()
-        self.todos_produtos = []
+        # Pares (titulo, url) já conhecidos, para checar duplicados em O(1); é a única
+        # informação guardada dos produtos da base
+        self._seen = set()
+        # Arquivo CSV mantido aberto durante a execução (aberto na primeira gravação)
+        self._arquivo_csv = None
+        self._escritor_csv = None
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
@@ -79,10 +109,21 @@ class SupernovaDiscosScraper:
             'Referer': 'https://www.supernovadiscos.com.br/',
             'Cache-Control': 'no-cache, no-store, must-revalidate'
         }
+        self.session = self._criar_sessao()
         
         # Verificar se já existe arquivo de produtos para continuar a partir dele
         self._carregar_produtos_existentes()
     
+    def _criar_sessao(self) -> requests.Session:
+        """Cria a sessão HTTP compartilhada por todas as requisições do scraper"""
+        sessao = requests.Session()
+        sessao.headers.update(self.headers)
+        # Conexões keep-alive (TCP + TLS) reaproveitadas entre as páginas, uma por worker,
+        # com novas tentativas automáticas em erros temporários do servidor
+        tentativas = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        sessao.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.MAX_CONEXOES, max_retries=tentativas))
+        return sessao
+    
     def _carregar_produtos_existentes(self) -> None:
         """Carrega produtos de um arquivo CSV existente, se disponível"""
         if os.path.exists(self.arquivo_saida):
@@ -92,10 +133,21 @@ class SupernovaDiscosScraper:
                     logger.info(f"Modo 'full' selecionado. Arquivo {self.arquivo_saida} será recriado.")
                     return
                 
-                with open(self.arquivo_saida, 'r', encoding='utf-8') as arquivo:
-                    leitor = csv.DictReader(arquivo)
-                    self.todos_produtos = list(leitor)
-                    logger.info(f"Carregados {len(self.todos_produtos)} produtos do arquivo existente.")
+                # Lê o arquivo linha a linha guardando só o par (titulo, url), sem
+                # materializar a base inteira em dicionários
+                total_linhas = 0
+                with open(self.arquivo_saida, 'r', encoding='utf-8', newline='') as arquivo:
+                    leitor = csv.reader(arquivo)
+                    cabecalho = next(leitor, None) or []
+                    idx_titulo = cabecalho.index('titulo') if 'titulo' in cabecalho else 0
+                    idx_url = cabecalho.index('url') if 'url' in cabecalho else 5
+                    idx_max = max(idx_titulo, idx_url)
+                    seen = self._seen
+                    for linha in leitor:
+                        if len(linha) > idx_max:
+                            seen.add((linha[idx_titulo], linha[idx_url]))
+                            total_linhas += 1
+                logger.info(f"Carregados {total_linhas} produtos do arquivo existente.")
             except Exception as e:
                 logger.error(f"Erro ao carregar arquivo existente: {e}")
     
@@ -116,25 +168,30 @@ class SupernovaDiscosScraper:
             else:
                 url = f"{url}?_t={int(time.time())}"
                 
-            resposta = requests.get(url, headers=self.headers, timeout=30)
+            resposta = self.session.get(url, timeout=30)
             resposta.raise_for_status()
-            return BeautifulSoup(resposta.text, 'html.parser')
+            # lxml (libxml2 em C) monta a árvore bem mais rápido que o html.parser
+            # puro Python; passa os bytes crus para ele detectar o encoding sozinho
+            return BeautifulSoup(resposta.content, 'lxml')
         except requests.exceptions.RequestException as e:
             logger.error(f"Erro na requisição para {url}: {e}")
             return None
     
-    def extrair_produtos_pagina(self, url: str) -> List[Dict[str, str]]:
+    def extrair_produtos_pagina(self, url: str, soup: Optional[BeautifulSoup] = None) -> List[Dict[str, str]]:
         """
         Extrai todos os produtos da seção de CDs da página
         
         Args:
             url: URL da página a ser processada
+            soup: Página já baixada e parseada (evita uma segunda requisição e um segundo parse)
             
         Returns:
             Lista de dicionários contendo informações dos produtos
         """
         produtos = []
-        soup = self._fazer_requisicao(url)
+        seen_page = set()
+        if soup is None:
+            soup = self._fazer_requisicao(url)
         
         if not soup:
             return produtos
@@ -160,6 +217,9 @@ class SupernovaDiscosScraper:
             
             logger.info(f"Encontrados {len(elementos_produto)} elementos de produto no HTML.")
             
+            # Método ligado a uma variável local para evitar a busca de atributo a cada produto
+            buscar_preco = _PRICE_RE.search
+            
             for elemento in elementos_produto:
                 try:
                     # Extrai o título do produto
@@ -190,7 +250,7 @@ class SupernovaDiscosScraper:
                     
                     if not preco_element:
                         # Tenta encontrar qualquer texto que corresponda ao padrão R$ XX,XX
-                        preco_text = elemento.find(string=re.compile(r'R\$\s*\d+[,.]\d+'))
+                        preco_text = elemento.find(string=_PRICE_RE)
                         if preco_text:
                             preco_texto = preco_text.strip()
                         else:
@@ -199,7 +259,7 @@ class SupernovaDiscosScraper:
                         preco_texto = preco_element.text.strip()
                     
                     # Limpa o preço usando regex
-                    preco_match = re.search(r'R\$\s*(\d+[,.]\d+)', preco_texto)
+                    preco_match = buscar_preco(preco_texto)
                     if preco_match:
                         preco_texto = f"R$ {preco_match.group(1)}"
                     else:
@@ -224,29 +284,23 @@ class SupernovaDiscosScraper:
                     # Categoria com base no título e URL
                     categoria = self.extrair_categoria(titulo, url_produto)
                     
-                    # Verifica se o produto já existe na lista
-                    if self.modo != "full":
-                        produto_existente = False
-                        for produto in self.todos_produtos:
-                            if produto.get('titulo') == titulo and produto.get('url') == url_produto:
-                                produto_existente = True
-                                break
-                        
-                        # Adiciona o produto se não for duplicado
-                        if produto_existente:
-                            continue
+                    # Verifica se o produto já existe na base (exceto no modo "full") ou nesta página
+                    chave = (titulo, url_produto)
+                    if (self.modo != "full" and chave in self._seen) or chave in seen_page:
+                        continue
                     
                     # Adiciona à lista de produtos
-                    if not any(p['titulo'] == titulo and p['url'] == url_produto for p in produtos):
-                        produtos.append({
-                            'titulo': titulo,
-                            'artista': artista,
-                            'album': album,
-                            'preco': preco_texto,
-                            'categoria': categoria,
-                            'url': url_produto,
-                            'data_extracao': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        })
+                    seen_page.add(chave)
+                    self._seen.add(chave)
+                    produtos.append({
+                        'titulo': titulo,
+                        'artista': artista,
+                        'album': album,
+                        'preco': preco_texto,
+                        'categoria': categoria,
+                        'url': url_produto,
+                        'data_extracao': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    })
                 
                 except Exception as e:
                     logger.error(f"Erro ao processar elemento de produto: {e}")
@@ -279,7 +333,7 @@ class SupernovaDiscosScraper:
                 partes = titulo.split(sep, 1)
                 if len(partes) == 2:
                     # Remove "CD" do início se presente e limpa espaços
-                    artista = re.sub(r'^CD\s+', '', partes[0]).strip()
+                    artista = _CD_PREFIX_RE.sub('', partes[0]).strip()
                     album = partes[1].strip()
                     break
         
@@ -296,31 +350,20 @@ class SupernovaDiscosScraper:
         Returns:
             Nome da categoria
         """
-        titulo_lower = titulo.lower()
+        # Título e URL numa única string: como nenhum termo contém "\n", testar
+        # o termo nela equivale a testar no título ou na URL, com metade das buscas
         url_lower = url_produto.lower()
+        texto = f"{titulo.lower()}\n{url_lower}"
         
-        # Categorias com mapeamento mais detalhado
-        categorias = [
-            (["rock", "pop"], "Rock / Pop"),
-            (["jazz"], "Jazz"),
-            (["brasil", "mpb", "samba", "bossa", "choro"], "Música do Brasil"),
-            (["world", "música do mundo"], "World Music"),
-            (["black", "soul", "funk", "r&b", "hip hop", "rap"], "Black Music"),
-            (["clássic", "erudito", "orquestra", "symphony"], "Eruditos"),
-            (["blues"], "Blues"),
-            (["reggae", "ska", "dub"], "Reggae"),
-            (["eletrônic", "techno", "house", "trance"], "Eletrônica")
-        ]
-        
-        # Verifica se alguma categoria corresponde ao título
-        for termos, categoria in categorias:
-            if any(termo in titulo_lower for termo in termos) or any(termo in url_lower for termo in termos):
-                return categoria
+        # Verifica se alguma categoria corresponde ao título ou à URL
+        for termos, categoria in _CATEGORIAS:
+            for termo in termos:
+                if termo in texto:
+                    return categoria
         
-        # Verifica categorias específicas na URL
-        if "rock" in url_lower or "pop" in url_lower:
-            return "Rock / Pop"
-        elif "nacional" in url_lower or "brasil" in url_lower:
+        # Verifica categorias específicas na URL ("rock", "pop" e "brasil" já
+        # foram cobertos pelo laço acima)
+        if "nacional" in url_lower:
             return "Música do Brasil"
         
         return "Outros Sons"
@@ -341,7 +384,7 @@ class SupernovaDiscosScraper:
             
         try:
             # Procura por links de paginação típicos
-            proxima_links = soup.find_all('a', string=lambda s: s and ('Próximo' in s or 'Próxima' in s or '»' in s))
+            proxima_links = soup.find_all('a', string=_NEXT_PAGE_RE)
             
             for link in proxima_links:
                 if link.has_attr('href'):
@@ -369,6 +412,10 @@ class SupernovaDiscosScraper:
         """
         Salva os produtos em um arquivo CSV
         
+        O arquivo é aberto na primeira chamada e mantido aberto (com um único csv.writer)
+        até _fechar_csv, em vez de ser reaberto a cada página; cada lote é descarregado
+        no disco com flush ao final da chamada.
+        
         Args:
             produtos: Lista de dicionários com informações dos produtos
             modo: Modo de escrita do arquivo ('w' para sobrescrever, 'a' para anexar)
@@ -382,31 +429,35 @@ class SupernovaDiscosScraper:
                 logger.warning("Nenhum produto para salvar.")
                 return False
             
-            # Campos a serem salvos
-            campos = ['titulo', 'artista', 'album', 'preco', 'categoria', 'url', 'data_extracao']
-            
-            # Verifica se o arquivo já existe e se o modo é 'w'
-            arquivo_existe = os.path.exists(self.arquivo_saida)
-            
-            # Escreve no arquivo CSV
-            with open(self.arquivo_saida, modo, newline='', encoding='utf-8') as arquivo:
-                escritor = csv.writer(arquivo, quoting=csv.QUOTE_ALL)
+            # Abre o arquivo na primeira gravação (ou reabre se for para sobrescrever)
+            if self._escritor_csv is None or modo == 'w':
+                self._fechar_csv()
+                
+                # Campos a serem salvos
+                campos = ['titulo', 'artista', 'album', 'preco', 'categoria', 'url', 'data_extracao']
+                
+                # Verifica se o arquivo já existe e se o modo é 'w'
+                arquivo_existe = os.path.exists(self.arquivo_saida)
+                
+                self._arquivo_csv = open(self.arquivo_saida, modo, newline='', encoding='utf-8')
+                self._escritor_csv = csv.writer(self._arquivo_csv, quoting=csv.QUOTE_ALL)
                 
                 # Escreve o cabeçalho apenas se estiver criando um novo arquivo
                 if modo == 'w' or not arquivo_existe:
-                    escritor.writerow(campos)
-                
-                # Escreve os dados de cada produto
-                for produto in produtos:
-                    escritor.writerow([
-                        produto.get('titulo', ''),
-                        produto.get('artista', ''),
-                        produto.get('album', ''),
-                        produto.get('preco', ''),
-                        produto.get('categoria', ''),
-                        produto.get('url', ''),
-                        produto.get('data_extracao', datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                    ])
+                    self._escritor_csv.writerow(campos)
+            
+            # Escreve os dados de cada produto
+            data_padrao = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self._escritor_csv.writerows([
+                produto.get('titulo', ''),
+                produto.get('artista', ''),
+                produto.get('album', ''),
+                produto.get('preco', ''),
+                produto.get('categoria', ''),
+                produto.get('url', ''),
+                produto.get('data_extracao', data_padrao)
+            ] for produto in produtos)
+            self._arquivo_csv.flush()
             
             logger.info(f"Dados salvos com sucesso no arquivo {self.arquivo_saida}")
             return True
@@ -414,12 +465,44 @@ class SupernovaDiscosScraper:
         except Exception as e:
             logger.error(f"Erro ao salvar arquivo CSV: {e}")
             return False
+    
+    def _fechar_csv(self) -> None:
+        """Fecha o arquivo CSV mantido aberto por salvar_para_csv, se houver"""
+        if self._arquivo_csv is not None:
+            try:
+                self._arquivo_csv.close()
+            except Exception as e:
+                logger.error(f"Erro ao fechar arquivo CSV: {e}")
+            self._arquivo_csv = None
+            self._escritor_csv = None
 
+    def _baixar_pagina(self, pagina: int) -> Tuple[int, str, Optional[BeautifulSoup]]:
+        """
+        Baixa uma página da listagem (executado nas threads do pool)
+        
+        Args:
+            pagina: Número da página (parâmetro mpage)
+            
+        Returns:
+            Tupla (pagina, url, soup), com soup None em caso de erro
+        """
+        # Constrói a URL da página usando o parâmetro mpage
+        url = f"{self.BASE_URL}/discos/cds/?sort_by=created-descending&mpage={pagina}"
+        
+        # Cada worker espera o seu próprio delay, então as requisições do lote
+        # saem espalhadas em vez de todas no mesmo instante
+        time.sleep(random.uniform(self.delay_min, self.delay_max))
+        return pagina, url, self._fazer_requisicao(url)
+    
     def extrair_produtos_com_paginacao(self) -> List[Dict[str, str]]:
         """
         Extrai produtos de múltiplas páginas simulando o comportamento de scroll infinito
         através de requisições paginadas
         
+        As páginas (mpage=N) não dependem umas das outras, então são baixadas em lotes
+        de até MAX_CONEXOES requisições simultâneas; o processamento continua na ordem
+        das páginas para manter as mesmas regras de parada e a ordem do CSV.
+        
         Returns:
             Lista com todos os produtos extraídos
         """
@@ -427,81 +510,79 @@ class SupernovaDiscosScraper:
         pagina_atual = 1
         falhas_consecutivas = 0
         produtos_vazios_consecutivos = 0
+        finalizar = False
         
         # Se estiver no modo "full", limpa os dados existentes
         if self.modo == "full" and os.path.exists(self.arquivo_saida):
             logger.info(f"Modo 'full' selecionado. Recriando o arquivo {self.arquivo_saida}")
-            self.todos_produtos = []
+            self._seen = set()
         
-        while pagina_atual <= self.max_paginas:
-            # Constrói a URL da página atual usando o parâmetro mpage
-            url = f"{self.BASE_URL}/discos/cds/?sort_by=created-descending&mpage={pagina_atual}"
-            
-            logger.info(f"Processando página {pagina_atual}: {url}")
-            
-            try:
-                # Faz a requisição e extrai os produtos
-                soup = self._fazer_requisicao(url)
-                if not soup:
-                    falhas_consecutivas += 1
-                    if falhas_consecutivas >= 3:
-                        logger.error("Três falhas consecutivas. Finalizando.")
-                        break
-                    
-                    # Aguarda um pouco mais antes de tentar novamente
-                    time.sleep(random.uniform(self.delay_max, self.delay_max * 2))
-                    continue
-                
-                # Extrai os produtos da página atual
-                produtos_pagina = self.extrair_produtos_pagina(url)
+        with ThreadPoolExecutor(max_workers=self.MAX_CONEXOES) as executor:
+            while pagina_atual <= self.max_paginas and not finalizar:
+                lote = range(pagina_atual, min(pagina_atual + self.MAX_CONEXOES, self.max_paginas + 1))
+                logger.info(f"Baixando páginas {lote.start} a {lote.stop - 1} em paralelo...")
                 
-                # Verifica se encontrou produtos na página
-                if not produtos_pagina:
-                    produtos_vazios_consecutivos += 1
-                    logger.warning(f"Nenhum produto encontrado na página {pagina_atual}. Tentativa {produtos_vazios_consecutivos} de 3.")
+                # executor.map devolve os resultados na ordem das páginas
+                for pagina, url, soup in executor.map(self._baixar_pagina, lote):
+                    logger.info(f"Processando página {pagina}: {url}")
                     
-                    # Se não encontrou produtos por três páginas seguidas, finaliza
-                    if produtos_vazios_consecutivos >= 3:
-                        logger.info("Três páginas consecutivas sem produtos. Finalizando.")
-                        break
-                else:
-                    produtos_vazios_consecutivos = 0
-                    
-                    # Adiciona os produtos à lista
-                    produtos_total.extend(produtos_pagina)
-                    
-                    # Determina o modo de escrita para o CSV
-                    if self.modo == "full" and pagina_atual == 1:
-                        modo_escrita = 'w'  # Sobrescreve o arquivo no modo "full" na primeira página
-                    else:
-                        modo_escrita = 'a'  # Anexa em todas as outras situações
-                    
-                    # Salva incrementalmente
-                    self.salvar_para_csv(produtos_pagina, modo=modo_escrita)
-                    
-                    # Adiciona à lista de todos os produtos
-                    self.todos_produtos.extend(produtos_pagina)
-                
-                # Avança para a próxima página
-                pagina_atual += 1
-                
-                # Pausa para não sobrecarregar o servidor
-                delay = random.uniform(self.delay_min, self.delay_max)
-                logger.info(f"Aguardando {delay:.2f} segundos antes da próxima requisição...")
-                time.sleep(delay)
-                
-                # Reseta contador de falhas
-                falhas_consecutivas = 0
-                
-            except Exception as e:
-                logger.error(f"Erro ao processar a página {pagina_atual}: {e}")
-                falhas_consecutivas += 1
-                if falhas_consecutivas >= 3:
-                    logger.error("Três falhas consecutivas. Finalizando.")
-                    break
+                    try:
+                        # Em caso de falha, tenta de novo a mesma página (sequencialmente)
+                        while not soup:
+                            falhas_consecutivas += 1
+                            if falhas_consecutivas >= 3:
+                                logger.error("Três falhas consecutivas. Finalizando.")
+                                finalizar = True
+                                break
+                            
+                            # Aguarda um pouco mais antes de tentar novamente
+                            time.sleep(random.uniform(self.delay_max, self.delay_max * 2))
+                            soup = self._fazer_requisicao(url)
+                        
+                        if finalizar:
+                            break
+                        
+                        # Extrai os produtos da página atual reaproveitando o soup já baixado
+                        produtos_pagina = self.extrair_produtos_pagina(url, soup)
+                        
+                        # Verifica se encontrou produtos na página
+                        if not produtos_pagina:
+                            produtos_vazios_consecutivos += 1
+                            logger.warning(f"Nenhum produto encontrado na página {pagina}. Tentativa {produtos_vazios_consecutivos} de 3.")
+                            
+                            # Se não encontrou produtos por três páginas seguidas, finaliza
+                            if produtos_vazios_consecutivos >= 3:
+                                logger.info("Três páginas consecutivas sem produtos. Finalizando.")
+                                finalizar = True
+                                break
+                        else:
+                            produtos_vazios_consecutivos = 0
+                            
+                            # Adiciona os produtos à lista
+                            produtos_total.extend(produtos_pagina)
+                            
+                            # Determina o modo de escrita para o CSV
+                            if self.modo == "full" and pagina == 1:
+                                modo_escrita = 'w'  # Sobrescreve o arquivo no modo "full" na primeira página
+                            else:
+                                modo_escrita = 'a'  # Anexa em todas as outras situações
+                            
+                            # Salva incrementalmente
+                            self.salvar_para_csv(produtos_pagina, modo=modo_escrita)
+                        
+                        # Reseta contador de falhas
+                        falhas_consecutivas = 0
+                        
+                    except Exception as e:
+                        logger.error(f"Erro ao processar a página {pagina}: {e}")
+                        falhas_consecutivas += 1
+                        if falhas_consecutivas >= 3:
+                            logger.error("Três falhas consecutivas. Finalizando.")
+                            finalizar = True
+                            break
                 
-                # Aguarda um pouco mais antes de tentar novamente
-                time.sleep(random.uniform(self.delay_max, self.delay_max * 2))
+                # Avança para o próximo lote
+                pagina_atual = lote.stop
         
         return produtos_total
 
@@ -513,12 +594,16 @@ class SupernovaDiscosScraper:
         tempo_inicio = time.time()
         
         # Extrai os produtos com paginação para simular scroll infinito
-        produtos_novos = self.extrair_produtos_com_paginacao()
+        try:
+            produtos_novos = self.extrair_produtos_com_paginacao()
+        finally:
+            self._fechar_csv()
+            self.session.close()
         
         # Exibe estatísticas finais
         tempo_total = time.time() - tempo_inicio
         logger.info(f"Extração concluída em {tempo_total:.2f} segundos.")
-        logger.info(f"Total de {len(self.todos_produtos)} produtos na base.")
+        logger.info(f"Total de {len(self._seen)} produtos na base.")
         logger.info(f"Foram adicionados {len(produtos_novos)} novos produtos nesta execução.")
 
 def main():
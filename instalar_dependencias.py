@@ -18,6 +18,7 @@ def instalar_dependencias():
         "requests",
         "beautifulsoup4",
         "lxml",
+        "brotli",
         "flask",
         "selenium",
         "webdriver-manager",
@@ -39,6 +40,7 @@ def instalar_dependencias():
     print("- requests: Para fazer requisições HTTP")
     print("- beautifulsoup4: Para análise de HTML")
     print("- lxml: Parser HTML/XML para BeautifulSoup")
+    print("- brotli: Descompactação de respostas HTTP em Brotli")
     print("- flask: Para o dashboard web")
     print("- selenium: Para automação de navegador web")
     print("- webdriver-manager: Para gerenciamento do driver do Selenium")